@@ -3,7 +3,8 @@ from flask import Blueprint, render_template, request, redirect, session, url_fo
 from flask_login import login_required, current_user
 from db import get_db
 import pymysql.cursors
-from services.notifications import notify
+from services.notification_outbox import queue_notifications
+from services.user_versions import bump_after_commit, claims_changed
 
 admin_claims_bp = Blueprint('admin_claims', __name__, url_prefix='/admin/claims', )
 
@@ -143,33 +144,33 @@ def claim_approve(claim_id):
                 WHERE match_id=%s AND id<>%s AND status='Pending'
             """, (match_id, claim_id))
 
-        conn.commit()
-        
-        # Send notification to claimant
-        notify(
-            user_id=claimant_user_id,
-            notification_type='claim_approved',
-            title='Claim Approved! ✅',
-            message=f'Your claim for "{lost_name}" has been approved. The item will be returned to you shortly.',
+        # Notify the claimant, and the other (now rejected) claimants for this match,
+        # in the same transaction; the outbox dispatcher delivers them
+        queue_notifications(
+            [claimant_user_id],
+            'claim_approved',
+            'Claim Approved! ✅',
+            f'Your claim for "{lost_name}" has been approved. The item will be returned to you shortly.',
             related_id=claim_id
         )
-        
-        # Send notification to other rejected claimants for this match
+        rejected_user_ids = []
         if match_id:
             cur.execute("""
                 SELECT DISTINCT user_id FROM claims
                 WHERE match_id=%s AND id<>%s AND status='Rejected'
             """, (match_id, claim_id))
-            rejected_claimants = cur.fetchall()
-            for claimant in rejected_claimants:
-                rejected_user_id = claimant.get('user_id')
-                notify(
-                    user_id=rejected_user_id,
-                    notification_type='claim_rejected',
-                    title='Claim Rejected ❌',
-                    message='Your claim has been rejected. Another claimant was approved for this item.',
-                    related_id=claim_id
-                )
+            rejected_user_ids = [claimant.get('user_id') for claimant in cur.fetchall()]
+            queue_notifications(
+                rejected_user_ids,
+                'claim_rejected',
+                'Claim Rejected ❌',
+                'Your claim has been rejected. Another claimant was approved for this item.',
+                related_id=claim_id
+            )
+
+        conn.commit()
+        claims_changed(lost_id, found_id, user_ids=[claimant_user_id])
+        bump_after_commit(rejected_user_ids, 'matches')
         
         flash('Claim approved successfully.', 'success')
         print(f"[CLAIM APPROVE] ✓ Claim {claim_id} approved. Notifications sent.")
@@ -195,7 +196,8 @@ def claim_reject(claim_id):
     cur = conn.cursor(pymysql.cursors.DictCursor)
     try:
         cur.execute("""
-            SELECT c.id, c.status, c.user_id, li.name as lost_name, fi.name as found_name
+            SELECT c.id, c.status, c.user_id, c.lost_item_id, c.found_item_id,
+                   li.name as lost_name, fi.name as found_name
             FROM claims c
             LEFT JOIN lost_items li ON li.id = c.lost_item_id
             LEFT JOIN found_items fi ON fi.id = c.found_item_id
@@ -216,20 +218,15 @@ def claim_reject(claim_id):
         lost_name = claim.get('lost_name') or claim.get('found_name') or 'item'
 
         cur.execute("UPDATE claims SET status='Rejected' WHERE id=%s", (claim_id,))
-        conn.commit()
-        
-        # Send notification to claimant
+
+        # Notify the claimant (delivered from the outbox once this commits)
         message = f'Your claim for "{lost_name}" has been rejected.'
         if reason:
             message += f' Reason: {reason}'
-        
-        notify(
-            user_id=claimant_user_id,
-            notification_type='claim_rejected',
-            title='Claim Rejected ❌',
-            message=message,
-            related_id=claim_id
-        )
+        queue_notifications([claimant_user_id], 'claim_rejected', 'Claim Rejected ❌', message, related_id=claim_id)
+
+        conn.commit()
+        claims_changed(claim.get('lost_item_id'), claim.get('found_item_id'), user_ids=[claimant_user_id])
         
         flash('Claim rejected.', 'info')
         print(f"[CLAIM REJECT] ✓ Claim {claim_id} rejected. Notification sent to claimant.")
@@ -261,7 +258,7 @@ def link_claim_to_item(claim_id):
     try:
         # Get current claim state
         cur.execute("""
-            SELECT c.id, c.lost_item_id, c.found_item_id, c.status
+            SELECT c.id, c.lost_item_id, c.found_item_id, c.status, c.user_id
             FROM claims c
             WHERE c.id=%s LIMIT 1
         """, (claim_id,))
@@ -297,6 +294,8 @@ def link_claim_to_item(claim_id):
             cur.execute("UPDATE claims SET found_item_id=%s WHERE id=%s", (item_id, claim_id))
         
         conn.commit()
+        linked_lost_id, linked_found_id = (item_id, found_item_id) if item_type == 'lost' else (lost_item_id, item_id)
+        claims_changed(linked_lost_id, linked_found_id, user_ids=[claim.get('user_id')])
         
         flash(f'Successfully linked {item_type} item "{item_name}" to claim #{claim_id}.', 'success')
         print(f"[LINK CLAIM] ✓ Claim {claim_id} linked to {item_type} item {item_id}")
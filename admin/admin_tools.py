@@ -1,14 +1,69 @@
 # routes/admin_tools.py (protected)
-from flask import Blueprint, flash, redirect, url_for
+import os
+
+from flask import flash, jsonify, redirect, request, url_for
 from flask_login import login_required
 
-from commands.run_matching import run_matching_job
+from db import pool_stats
+from services.job_handlers import enqueue_matching_run
+from services.jobs import get_job, list_jobs
+from services.sql_profiler import recent_profiles
+from .init import admin_bp
 
-admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/run-matching')
 @login_required
 def run_matching():
-    count = run_matching_job()
-    flash(f"Matching job inserted {count} new matches.", "info")
+    # e.g. /admin/run-matching?threshold=0.8&top_k=5&found_top_k=3 (0 = no limit)
+    threshold = request.args.get('threshold', 0.75, type=float)
+    top_k = request.args.get('top_k', type=int)
+    found_top_k = request.args.get('found_top_k', type=int)
+    job_id = enqueue_matching_run(threshold=threshold, top_k=top_k, found_top_k=found_top_k)
+    flash(f"Matching job #{job_id} queued. Progress: {url_for('admin.job_status', job_id=job_id)}", "info")
     return redirect(url_for('admin.dashboard'))
+
+
+@admin_bp.route('/jobs')
+@login_required
+def jobs_list():
+    status = request.args.get('status')
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({'jobs': list_jobs(status=status, limit=limit)})
+
+
+@admin_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@admin_bp.route('/db-pool')
+@login_required
+def db_pool_stats():
+    return jsonify({'pid': os.getpid(), 'pool': pool_stats()})
+
+
+@admin_bp.route('/sql-profile')
+@login_required
+def sql_profile():
+    # e.g. /admin/sql-profile?endpoint=user.dashboard&limit=10 (profiles of this worker process only)
+    endpoint = request.args.get('endpoint')
+    limit = request.args.get('limit', 20, type=int)
+    profiles = recent_profiles(endpoint=endpoint)
+
+    by_endpoint = {}
+    for profile in profiles:
+        entry = by_endpoint.setdefault(profile['endpoint'], {'requests': 0, 'queries': 0, 'db_ms': 0.0,
+                                                              'n_plus_one': 0})
+        entry['requests'] += 1
+        entry['queries'] += profile['queries']
+        entry['db_ms'] += profile['db_ms']
+        entry['n_plus_one'] += bool(profile['n_plus_one'])
+    for entry in by_endpoint.values():
+        entry['avg_queries'] = round(entry.pop('queries') / entry['requests'], 1)
+        entry['avg_db_ms'] = round(entry.pop('db_ms') / entry['requests'], 2)
+
+    return jsonify({'pid': os.getpid(), 'by_endpoint': by_endpoint, 'requests': profiles[:limit]})
@@ -10,3 +10,4 @@ admin_bp = Blueprint(
 
 # Import routes so they register with admin_bp
 from . import routes
+from . import admin_tools
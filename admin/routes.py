@@ -4,6 +4,7 @@ import pymysql
 
 from db import get_db
 from models.user import User
+from services.notifications import admins_changed
 from .init import admin_bp  
 
 
@@ -120,6 +121,7 @@ def edit_user(id):
                 SET role=%s, active=%s
                 WHERE id=%s
             """, (role, active, id))
+            admins_changed()
             conn.commit()
             flash('User updated successfully!', 'success')
         except Exception as e:
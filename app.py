@@ -1,13 +1,15 @@
 from flask import Flask, redirect, url_for
 from extensions import bcrypt, login_manager
+from db import init_app as init_db
 from auth.routes import auth_bp
 from user.routes import user_bp
 from user.user_items import user_items_bp
 from admin.init import admin_bp 
 from admin.admin_claims import admin_claims_bp
 from services.notifications_routes import notifications_bp
+from services.health_routes import health_bp
 from flask_login import current_user
-from services.notifications import get_unread_count, get_recent_notifications
+from services.notifications import get_notification_summary
 
 app = Flask(__name__, template_folder='project/templates')
 app.secret_key = 'secret_key_here'
@@ -15,6 +17,8 @@ app.secret_key = 'secret_key_here'
 # --- Initialize extensions ---
 bcrypt.init_app(app)
 login_manager.init_app(app)
+# One shared connection/transaction per request, committed after the view
+init_db(app)
 
 # --- Register blueprints ---
 app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -23,6 +27,7 @@ app.register_blueprint(user_items_bp, url_prefix='/user')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 app.register_blueprint(admin_claims_bp)
 app.register_blueprint(notifications_bp)
+app.register_blueprint(health_bp)
 
 # --- Context Processor for Notifications ---
 @app.context_processor
@@ -30,8 +35,10 @@ def inject_notifications():
     """Inject notification data into all templates."""
     try:
         if current_user.is_authenticated:
-            unread_notifications_count = get_unread_count(current_user.id)
-            notifications = get_recent_notifications(current_user.id, limit=5)
+            # Cached per user; notify/mark/delete invalidate it
+            summary = get_notification_summary(current_user.id, limit=5)
+            unread_notifications_count = summary['unread_count']
+            notifications = summary['recent']
         else:
             unread_notifications_count = 0
             notifications = []
@@ -0,0 +1,123 @@
+# app/commands/ann_recall.py
+"""
+Recall-vs-exact harness for the IVF index in services/ann_index.py.
+
+Usage:
+    python -m commands.ann_recall                      # lost items vs found items from MySQL
+    python -m commands.ann_recall --synthetic 20000    # random clustered vectors, no DB needed
+    python -m commands.ann_recall --n-probe 4 8 16 --min-recall 0.95
+
+For every n_probe value it reports recall@k (share of the exact top-k
+found ids the index returns) and threshold recall (share of the exact
+pairs >= threshold, i.e. what generate_matches would emit), plus the mean
+query time. Exits with status 1 if threshold recall is below --min-recall
+for the default n_probe.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from services.ann_index import IVFIndex
+from services.similarity import iter_score_blocks, normalize_rows
+
+
+def load_db_vectors():
+    from services.item_index import fetch_embedding_rows
+    from services.similarity import build_embedding_matrix
+
+    _, queries = build_embedding_matrix(fetch_embedding_rows('lost'), label='lost')
+    found_ids, corpus = build_embedding_matrix(fetch_embedding_rows('found'), label='found')
+    return found_ids, corpus, queries
+
+
+def synthetic_vectors(n_corpus, n_queries, dim=384, n_clusters=200, seed=0):
+    """Clustered random vectors with near-duplicate queries, like lost/found pairs."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    corpus = centers[rng.integers(0, n_clusters, n_corpus)] + rng.normal(scale=0.6, size=(n_corpus, dim))
+    picks = rng.integers(0, n_corpus, n_queries)
+    queries = corpus[picks] + rng.normal(scale=0.4, size=(n_queries, dim))
+    return (list(range(1, n_corpus + 1)),
+            normalize_rows(corpus.astype(np.float32)),
+            normalize_rows(queries.astype(np.float32)))
+
+
+def exact_results(queries, corpus, ids, k, threshold):
+    """Brute-force top-k ids and above-threshold id sets for every query."""
+    top_k = []
+    above = []
+    for r0, _, block in iter_score_blocks(queries, corpus):
+        for row in block:
+            kk = min(k, row.shape[0])
+            top = np.argpartition(-row, kk - 1)[:kk]
+            top_k.append({ids[i] for i in top.tolist()})
+            above.append({ids[i] for i in np.nonzero(row >= threshold)[0].tolist()})
+    return top_k, above
+
+
+def measure(index, queries, exact_top, exact_above, k, threshold, n_probe):
+    hit_top = total_top = hit_above = total_above = 0
+    started = time.perf_counter()
+    results = [index.search(q, k=k, n_probe=n_probe) for q in queries]
+    threshold_results = [index.search(q, k=None, threshold=threshold, n_probe=n_probe) for q in queries]
+    elapsed = (time.perf_counter() - started) / max(2 * len(queries), 1)
+
+    for got, got_above, want, want_above in zip(results, threshold_results, exact_top, exact_above):
+        hit_top += len({i for i, _ in got} & want)
+        total_top += len(want)
+        hit_above += len({i for i, _ in got_above} & want_above)
+        total_above += len(want_above)
+
+    return (hit_top / max(total_top, 1),
+            hit_above / total_above if total_above else 1.0,
+            total_above,
+            elapsed * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ANN recall against brute-force matching.")
+    parser.add_argument('--synthetic', type=int, metavar='N', help="use N random vectors instead of MySQL")
+    parser.add_argument('--queries', type=int, default=500, help="synthetic query count")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=0.75)
+    parser.add_argument('--n-probe', type=int, nargs='+', default=[2, 4, 8, 16])
+    parser.add_argument('--n-lists', type=int, default=None)
+    parser.add_argument('--min-recall', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        ids, corpus, queries = synthetic_vectors(args.synthetic, args.queries)
+    else:
+        ids, corpus, queries = load_db_vectors()
+    if not ids or not len(queries):
+        print("Nothing to compare: need both lost and found embeddings.")
+        return 0
+
+    started = time.perf_counter()
+    index = IVFIndex(corpus.shape[1])
+    index.insert(ids, corpus)
+    index.train(n_lists=args.n_lists)
+    print(f"Built index over {len(index)} vectors, {index.n_lists} lists "
+          f"in {time.perf_counter() - started:.2f}s; {len(queries)} queries")
+
+    exact_top, exact_above = exact_results(queries, corpus, ids, args.k, args.threshold)
+
+    default_recall = None
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'thr recall':>11} {'pairs':>7} {'ms/query':>9}")
+    for n_probe in args.n_probe:
+        recall_k, recall_thr, pairs, ms = measure(index, queries, exact_top, exact_above,
+                                                  args.k, args.threshold, n_probe)
+        print(f"{n_probe:>8} {recall_k:>10.3f} {recall_thr:>11.3f} {pairs:>7} {ms:>9.3f}")
+        if n_probe == index.n_probe:
+            default_recall = recall_thr
+
+    if args.min_recall is not None and default_recall is not None and default_recall < args.min_recall:
+        print(f"FAIL: threshold recall {default_recall:.3f} < {args.min_recall} at n_probe={index.n_probe}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+# app/commands/backfill_embeddings.py
+"""
+Re-embed lost/found items that are missing an embedding or carry an
+outdated one, using the batched model API.
+
+Usage:
+    python -m commands.backfill_embeddings [--table lost|found|all] [--batch-size 256]
+                                           [--encode-batch-size 64] [--force] [--restart]
+
+An embedding is outdated if it is still JSON text, packed in a dtype other
+than the storage format (services.embeddings.storage_dtype), or has a different dimension than the current model
+(e.g. after switching models). --force re-embeds every row.
+
+Rows are read in id order (keyset paging) and the last finished id per
+table is written to a checkpoint file after every page, so an interrupted
+run resumes where it stopped; --restart ignores the checkpoint. A table's
+entry is dropped once it finishes, so the next run scans it again. New
+vectors are also written to the shared embedding store, and the ANN
+index is rebuilt at the end; restart the job worker afterwards so it
+loads the new index.
+"""
+import argparse
+import json
+import os
+import time
+
+from db import get_db
+from services.embedding_cache import get_cache
+from services.embeddings import (
+    compute_item_embeddings_batch, decode_embedding, embedding_dimension, is_binary_embedding,
+    serialize_embedding, storage_dtype
+)
+
+PAGE_QUERIES = {
+    'lost': """
+        SELECT id, name, description, last_seen AS location, last_seen_at AS date, embedding
+        FROM lost_items WHERE id > %s ORDER BY id LIMIT %s
+    """,
+    'found': """
+        SELECT id, name, description, where_found AS location, found_at AS date, embedding
+        FROM found_items WHERE id > %s ORDER BY id LIMIT %s
+    """,
+}
+TABLES = {'lost': 'lost_items', 'found': 'found_items'}
+DEFAULT_CHECKPOINT = os.path.join('instance', 'backfill_embeddings.json')
+
+
+def is_outdated(raw, dim):
+    """True if a stored embedding needs to be recomputed."""
+    if not raw:
+        return True
+    dtype = storage_dtype()
+    if dtype == 'json':
+        if is_binary_embedding(raw):
+            return True
+    elif not is_binary_embedding(raw, dtype):
+        return True
+    try:
+        return decode_embedding(raw).shape[0] != dim
+    except (ValueError, TypeError):
+        return True
+
+
+def load_checkpoint(path, settings):
+    """Return {kind: last id} from the checkpoint if it was written with the same settings."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get('settings') != settings:
+        print(f"[BACKFILL] Checkpoint {path} was written with other settings, starting over")
+        return {}
+    # Older checkpoints marked finished tables 'done'; those start over like any finished table
+    return {kind: last_id for kind, last_id in data.get('last_ids', {}).items() if isinstance(last_id, int)}
+
+
+def save_checkpoint(path, settings, last_ids):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'settings': settings, 'last_ids': last_ids}, f)
+    os.replace(tmp_path, path)
+
+
+def push_to_store(kind, ids, embeddings):
+    """Replace the vectors of re-embedded items in the shared embedding store."""
+    from services.embedding_store import EMBEDDING_STORE_ENABLED, get_store
+
+    if EMBEDDING_STORE_ENABLED and ids:
+        get_store(kind).put(ids, embeddings)
+
+
+def backfill_table(kind, dim, last_id=0, batch_size=256, encode_batch_size=None, force=False,
+                   on_page=None):
+    """
+    Re-embed the outdated rows of one table, one page of ids at a time.
+
+    Args:
+        kind (str): 'lost' or 'found'
+        dim (int): Embedding dimension of the current model
+        last_id (int): Resume after this id
+        batch_size (int): Rows read per page
+        encode_batch_size (int, optional): Texts per model forward pass
+        force (bool): Re-embed every row
+        on_page (callable, optional): Called with the last id of each finished page
+
+    Returns:
+        tuple: (rows scanned, rows re-embedded)
+    """
+    table = TABLES[kind]
+    scanned = embedded = 0
+    started = time.time()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(PAGE_QUERIES[kind], (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            scanned += len(rows)
+
+            todo = [row for row in rows if force or is_outdated(row['embedding'], dim)]
+            if todo:
+                embeddings = compute_item_embeddings_batch(todo, batch_size=encode_batch_size)
+                done = [(row['id'], emb) for row, emb in zip(todo, embeddings) if emb]
+                if done:
+                    cur.executemany(f"UPDATE {table} SET embedding = %s WHERE id = %s",
+                                    [(serialize_embedding(emb), item_id) for item_id, emb in done])
+                    conn.commit()
+                    push_to_store(kind, [item_id for item_id, _ in done], [emb for _, emb in done])
+                    embedded += len(done)
+
+            if on_page:
+                on_page(last_id)
+            elapsed = max(time.time() - started, 1e-6)
+            print(f"[BACKFILL] {table}: up to id {last_id}, {embedded}/{scanned} re-embedded "
+                  f"({scanned / elapsed:.0f} rows/s scanned, {embedded / elapsed:.1f} rows/s embedded)")
+    finally:
+        cur.close()
+        conn.close()
+    return scanned, embedded
+
+
+def backfill_embeddings(kinds=('lost', 'found'), batch_size=256, encode_batch_size=None, force=False,
+                        checkpoint=DEFAULT_CHECKPOINT, restart=False):
+    dim = embedding_dimension()
+    settings = {'dtype': storage_dtype(), 'dim': dim, 'force': force}
+    last_ids = {} if restart else load_checkpoint(checkpoint, settings)
+
+    for kind in kinds:
+        start_id = last_ids.get(kind, 0)
+        if start_id:
+            print(f"[BACKFILL] Resuming {TABLES[kind]} after id {start_id}")
+
+        def on_page(last_id, kind=kind):
+            last_ids[kind] = last_id
+            save_checkpoint(checkpoint, settings, last_ids)
+
+        scanned, embedded = backfill_table(kind, dim, last_id=start_id, batch_size=batch_size,
+                                           encode_batch_size=encode_batch_size, force=force,
+                                           on_page=on_page)
+        last_ids.pop(kind, None)
+        save_checkpoint(checkpoint, settings, last_ids)
+        print(f"[BACKFILL] {TABLES[kind]}: {embedded} of {scanned} rows re-embedded")
+
+        from services.item_index import ANN_INDEX_ENABLED, rebuild_index
+        if ANN_INDEX_ENABLED and embedded:
+            rebuild_index(kind)
+
+    # Tables another (interrupted) run left half-done keep their entry
+    if not last_ids and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    cache = get_cache()
+    if cache:
+        print(f"[BACKFILL] Embedding cache: {cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-embed items with missing or outdated embeddings.")
+    parser.add_argument('--table', choices=['lost', 'found', 'all'], default='all')
+    parser.add_argument('--batch-size', type=int, default=256, help="rows read per page")
+    parser.add_argument('--encode-batch-size', type=int, default=None, help="texts per model forward pass")
+    parser.add_argument('--force', action='store_true', help="re-embed every row")
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint file")
+    args = parser.parse_args()
+
+    kinds = ('lost', 'found') if args.table == 'all' else (args.table,)
+    backfill_embeddings(kinds=kinds, batch_size=args.batch_size, encode_batch_size=args.encode_batch_size,
+                        force=args.force, checkpoint=args.checkpoint, restart=args.restart)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# app/commands/bench_encoder.py
+"""
+Parity and latency/memory benchmark of the embedding backends.
+
+Usage:
+    python -m commands.bench_encoder [--backends torch onnx] [--texts 200] [--min-cosine 0.99]
+
+Each backend runs in its own subprocess so its peak RSS is measured in
+isolation. Both encode the same texts (item texts from MySQL when
+available, otherwise built-in samples); the report shows load time,
+peak RSS, single-text latency (p50/p95) and batch throughput, then the
+cosine agreement of every backend with the first one. Exits with status
+1 if the minimum cosine is below --min-cosine.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SAMPLE_TEXTS = [
+    "Name: Black leather wallet. Description: Contains student ID and bank cards. Location: Library 2nd floor",
+    "Name: iPhone 13. Description: Blue case with a cracked screen protector. Location: Cafeteria",
+    "Name: Umbrella. Description: Red foldable umbrella. Location: Gym entrance. Date: 2025-01-10",
+    "Name: Calculator. Description: Casio fx-991ES. Location: Room 204",
+    "Name: Keys. Description: Three keys on a Pikachu keychain. Location: Parking lot B",
+    "Name: Water bottle. Description: Green Hydro Flask with stickers. Location: Science building",
+    "Name: Laptop charger. Description: USB-C 65W Lenovo charger. Location: Computer lab",
+    "Name: ID card. Description: Employee ID, lanyard attached. Location: Main gate",
+]
+
+
+def load_texts(limit):
+    """Item texts from MySQL, falling back to the built-in samples."""
+    try:
+        from db import get_db
+        from services.embeddings import build_item_text
+
+        conn = get_db()
+        cur = conn.cursor()
+        try:
+            cur.execute("""
+                SELECT name, description, last_seen AS location, last_seen_at AS date FROM lost_items
+                UNION ALL
+                SELECT name, description, where_found, found_at FROM found_items
+                LIMIT %s
+            """, (limit,))
+            texts = [build_item_text(r['name'], r['description'], r['location'], r['date'])
+                     for r in cur.fetchall()]
+        finally:
+            cur.close()
+            conn.close()
+        texts = [t for t in texts if t]
+        if texts:
+            return texts
+    except Exception as e:
+        print(f"[BENCH] Using sample texts ({e})", file=sys.stderr)
+    return [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" #{i}" for i in range(limit)]
+
+
+def run_child(backend, texts, batch_size):
+    """Measure one backend in this process and print a JSON result line."""
+    from services.embeddings import load_encoder
+
+    started = time.perf_counter()
+    model = load_encoder(backend)
+    model.encode(texts[:1])
+    load_s = time.perf_counter() - started
+
+    single = []
+    for text in texts[:50]:
+        t0 = time.perf_counter()
+        model.encode([text])
+        single.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    vectors = np.asarray(model.encode(texts, batch_size=batch_size), dtype=np.float32)
+    batch_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        'backend': backend,
+        'load_s': round(load_s, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'single_p50_ms': round(float(np.percentile(single, 50)), 2),
+        'single_p95_ms': round(float(np.percentile(single, 95)), 2),
+        'batch_texts_per_s': round(len(texts) / batch_s, 1),
+        'vectors': vectors.tolist(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends for parity, latency and memory.")
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx'])
+    parser.add_argument('--texts', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--min-cosine', type=float, default=0.99)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(sys.stdin.read()), args.batch_size)
+        return 0
+
+    texts = load_texts(args.texts)
+    results = []
+    for backend in args.backends:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'commands.bench_encoder', '--child', backend,
+             '--batch-size', str(args.batch_size)],
+            input=json.dumps(texts), capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            print(f"[BENCH] {backend} failed:\n{proc.stderr}")
+            return 1
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"{len(texts)} texts, batch size {args.batch_size}")
+    print(f"{'backend':>8} {'load s':>7} {'peak RSS MB':>12} {'p50 ms':>7} {'p95 ms':>7} {'texts/s':>8}")
+    for r in results:
+        print(f"{r['backend']:>8} {r['load_s']:>7} {r['peak_rss_mb']:>12} {r['single_p50_ms']:>7} "
+              f"{r['single_p95_ms']:>7} {r['batch_texts_per_s']:>8}")
+
+    reference = np.asarray(results[0]['vectors'], dtype=np.float32)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+    worst = 1.0
+    for r in results[1:]:
+        vectors = np.asarray(r['vectors'], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        cosines = (reference * vectors).sum(axis=1)
+        worst = min(worst, float(cosines.min()))
+        print(f"cosine {results[0]['backend']} vs {r['backend']}: "
+              f"mean {cosines.mean():.5f}, min {cosines.min():.5f}")
+
+    if worst < args.min_cosine:
+        print(f"FAIL: minimum cosine {worst:.5f} < {args.min_cosine}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
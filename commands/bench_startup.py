@@ -0,0 +1,75 @@
+# app/commands/bench_startup.py
+"""
+Cold-start benchmark for the web app: import time and RSS of `import app`.
+
+Usage:
+    python -m commands.bench_startup [--runs 5] [--max-seconds 2.0] [--max-rss-mb 150]
+
+Each run imports the app in a fresh interpreter and reports wall time,
+peak RSS and which heavy modules (numpy, torch, sentence_transformers,
+sklearn, ...) got imported. The web app only enqueues embedding and
+matching jobs, so none of them should be loaded; the command exits with
+status 1 if one is, or if the median time/RSS exceeds the given limits.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ('numpy', 'scipy', 'sklearn', 'torch', 'transformers', 'sentence_transformers',
+                 'onnxruntime', 'tokenizers')
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': [name for name in %r if name in sys.modules],
+    'modules': len(sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once():
+    proc = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and RSS of the web app.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    parser.add_argument('--max-rss-mb', type=float, default=None)
+    args = parser.parse_args()
+
+    results = [measure_once() for _ in range(args.runs)]
+    seconds = statistics.median(r['seconds'] for r in results)
+    rss_mb = statistics.median(r['rss_mb'] for r in results)
+    heavy = sorted({name for r in results for name in r['heavy']})
+
+    print(f"import app: median {seconds * 1000:.0f} ms "
+          f"(min {min(r['seconds'] for r in results) * 1000:.0f} ms) over {args.runs} runs")
+    print(f"peak RSS: median {rss_mb:.1f} MB, {results[0]['modules']} modules loaded")
+    print(f"heavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: the web app imports {', '.join(heavy)} at startup")
+        failed = True
+    if args.max_seconds is not None and seconds > args.max_seconds:
+        print(f"FAIL: import time {seconds:.2f}s > {args.max_seconds}s")
+        failed = True
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        print(f"FAIL: RSS {rss_mb:.1f} MB > {args.max_rss_mb} MB")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
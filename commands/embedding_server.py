@@ -0,0 +1,171 @@
+# app/commands/embedding_server.py
+"""
+Local embedding server: one process owns the sentence encoder and serves
+every web/job worker over a Unix socket.
+
+Usage:
+    EMBEDDING_SOCKET=/tmp/embedding.sock python -m commands.embedding_server
+    python -m commands.embedding_server --socket /tmp/embedding.sock --stats   # print counters
+
+Clients (services.embeddings.encode_remote) send the texts they could not
+find in the embedding cache. Requests that arrive within
+EMBEDDING_BATCH_WAIT_MS of each other are coalesced into one
+model.encode() call of up to EMBEDDING_SERVER_MAX_BATCH texts, so
+concurrent single-item requests share a forward pass. Workers fall back
+to in-process encoding while the server is down.
+"""
+import argparse
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import numpy as np
+
+from services.embeddings import EMBEDDING_SOCKET, get_model, recv_message, send_message
+
+BATCH_WAIT_MS = float(os.getenv('EMBEDDING_BATCH_WAIT_MS', '5'))
+MAX_BATCH = int(os.getenv('EMBEDDING_SERVER_MAX_BATCH', '64'))
+
+
+class MicroBatcher:
+    """Collects concurrent encode requests and runs them as one batch."""
+
+    def __init__(self, model, max_batch=MAX_BATCH, wait_ms=BATCH_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.wait = wait_ms / 1000
+        self.dim = model.get_sentence_embedding_dimension()
+        self._queue = queue.Queue()
+        self.stats = {'requests': 0, 'texts': 0, 'batches': 0, 'encode_seconds': 0.0}
+        threading.Thread(target=self._run, name='micro-batcher', daemon=True).start()
+
+    def submit(self, texts):
+        """Block until the texts are encoded; returns a (len(texts), dim) matrix."""
+        request = {'texts': texts, 'done': threading.Event(), 'result': None, 'error': None}
+        self._queue.put(request)
+        request['done'].wait()
+        if request['error']:
+            raise RuntimeError(request['error'])
+        return request['result']
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        count = len(batch[0]['texts'])
+        deadline = time.monotonic() + self.wait
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            count += len(request['texts'])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request in batch for text in request['texts']]
+            started = time.perf_counter()
+            try:
+                vectors = np.asarray(self.model.encode(texts, batch_size=self.max_batch), dtype='<f4')
+                offset = 0
+                for request in batch:
+                    request['result'] = vectors[offset:offset + len(request['texts'])]
+                    offset += len(request['texts'])
+            except Exception as e:
+                print(f"[EMBED SERVER] ERROR encoding batch of {len(texts)}: {e}")
+                for request in batch:
+                    request['error'] = str(e)
+            self.stats['encode_seconds'] += time.perf_counter() - started
+            self.stats['requests'] += len(batch)
+            self.stats['texts'] += len(texts)
+            self.stats['batches'] += 1
+            for request in batch:
+                request['done'].set()
+
+    def snapshot(self):
+        stats = dict(self.stats)
+        stats['avg_batch_texts'] = round(stats['texts'] / stats['batches'], 2) if stats['batches'] else None
+        stats['encode_seconds'] = round(stats['encode_seconds'], 3)
+        return stats
+
+
+class EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            header, _ = recv_message(self.request)
+            if header.get('stats'):
+                send_message(self.request, dict(self.server.batcher.snapshot(), ok=True))
+                return
+            texts = [str(text) for text in header.get('texts') or []]
+            vectors = self.server.batcher.submit(texts) if texts else np.zeros((0, self.server.batcher.dim), '<f4')
+            send_message(self.request, {'ok': True, 'dim': self.server.batcher.dim, 'count': len(texts)},
+                         np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+        except (OSError, ValueError) as e:
+            print(f"[EMBED SERVER] Dropped request: {e}")
+        except RuntimeError as e:
+            send_message(self.request, {'ok': False, 'error': str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every web/job worker thread may connect at once
+    request_queue_size = 128
+
+
+def serve(socket_path):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    started = time.time()
+    batcher = MicroBatcher(get_model())
+    server = EmbeddingServer(socket_path, EmbeddingRequestHandler)
+    server.batcher = batcher
+
+    def stop(signum, frame):
+        print(f"[EMBED SERVER] Received signal {signum}, shutting down")
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"[EMBED SERVER] Model loaded in {time.time() - started:.1f}s; listening on {socket_path} "
+          f"(batch <= {batcher.max_batch} texts, wait {batcher.wait * 1000:.0f} ms)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        print(f"[EMBED SERVER] Stopped; {batcher.snapshot()}")
+
+
+def print_stats(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_message(sock, {'stats': True})
+        header, _ = recv_message(sock)
+    header.pop('payload_bytes', None)
+    print(header)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix socket.")
+    parser.add_argument('--socket', default=EMBEDDING_SOCKET or '/tmp/embedding.sock')
+    parser.add_argument('--stats', action='store_true', help="print the running server's counters")
+    args = parser.parse_args()
+    if args.stats:
+        print_stats(args.socket)
+        return 0
+    serve(args.socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
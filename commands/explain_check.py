@@ -0,0 +1,162 @@
+# app/commands/explain_check.py
+"""
+EXPLAIN every SQL statement in the request-handling code and fail on
+full table scans of large tables.
+
+Usage:
+    python -m commands.explain_check [--min-rows 10000] [--verbose]
+
+Statements are collected statically: every cur.execute("...") whose
+first argument is a string literal in the modules of ROUTE_MODULES.
+Placeholders are replaced with sample values, the statement is run
+through EXPLAIN (nothing is executed) and any plan step with access type
+ALL on a table holding at least --min-rows rows (information_schema
+estimate) is reported. SQL built at runtime (f-strings, concatenation)
+is listed as skipped. Exits with status 1 if a scan was found.
+"""
+import argparse
+import ast
+import glob
+import os
+import re
+import sys
+
+from db import get_db
+
+ROUTE_MODULES = ('admin/*.py', 'auth/*.py', 'user/*.py',
+                 'services/notifications_routes.py', 'services/notifications.py')
+
+# (module, function) -> tables it is expected to scan in full (admin "list everything" pages)
+ACCEPTED_FULL_SCANS = {
+    ('admin/routes.py', 'dashboard'): {'users'},
+    ('admin/routes.py', 'users_page'): {'users'},
+}
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE)\s+`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?', re.IGNORECASE)
+NOT_ALIASES = {'where', 'on', 'left', 'right', 'inner', 'join', 'order', 'group', 'limit', 'set',
+               'union', 'having', 'cross', 'straight_join', 'using', 'for'}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def collect_statements():
+    """
+    Return ([(location, module, function, sql)], [skipped locations]) for the
+    execute() calls in ROUTE_MODULES.
+    """
+    statements, skipped = [], []
+    paths = sorted({path for pattern in ROUTE_MODULES for path in glob.glob(os.path.join(ROOT, pattern))})
+    for path in paths:
+        module = os.path.relpath(path, ROOT).replace(os.sep, '/')
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=module)
+        for func in ast.walk(tree):
+            if not isinstance(func, ast.FunctionDef):
+                continue
+            for node in ast.walk(func):
+                if not (isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'execute'
+                        and node.args):
+                    continue
+                location = f"{module}:{node.lineno}"
+                sql = node.args[0]
+                if not (isinstance(sql, ast.Constant) and isinstance(sql.value, str)):
+                    skipped.append(f"{location} ({func.name})")
+                    continue
+                sql = ' '.join(sql.value.split())
+                if sql.split(' ', 1)[0].upper() in EXPLAINABLE and 'LAST_INSERT_ID' not in sql.upper():
+                    statements.append((location, module, func.name, sql))
+    # Nested functions are walked twice; keep each call site once
+    seen = set()
+    unique = []
+    for statement in statements:
+        if statement[0] not in seen:
+            seen.add(statement[0])
+            unique.append(statement)
+    return unique, skipped
+
+
+def with_sample_values(sql):
+    """Fill %s placeholders: integers after LIMIT/OFFSET, a string literal elsewhere."""
+    sql = re.sub(r'\b(LIMIT|OFFSET)\s+%s', r'\1 10', sql, flags=re.IGNORECASE)
+    return sql.replace('%s', "'1'").replace('%%', '%')
+
+
+def table_aliases(sql):
+    """Map every alias (and table name) in FROM/JOIN/UPDATE clauses to its table."""
+    aliases = {}
+    for table, alias in TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.lower() not in NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def table_sizes(cur):
+    cur.execute("""
+        SELECT TABLE_NAME AS name, TABLE_ROWS AS table_rows
+        FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()
+    """)
+    return {row['name']: int(row['table_rows'] or 0) for row in cur.fetchall()}
+
+
+def check(min_rows=10000, verbose=False):
+    """
+    EXPLAIN the collected statements.
+
+    Returns:
+        list: [(location, function, table, estimated table rows, sql)] of offending scans
+    """
+    statements, skipped = collect_statements()
+    conn = get_db(scoped=False)
+    cur = conn.cursor()
+    problems = []
+    try:
+        sizes = table_sizes(cur)
+        for location, module, function, sql in statements:
+            aliases = table_aliases(sql)
+            try:
+                cur.execute("EXPLAIN " + with_sample_values(sql))
+                plan = cur.fetchall()
+            except Exception as e:
+                print(f"[EXPLAIN] {location} ({function}) could not be explained: {e}")
+                continue
+            for step in plan:
+                table = aliases.get(step.get('table'), step.get('table'))
+                rows = sizes.get(table)
+                if verbose:
+                    print(f"[EXPLAIN] {location} {step.get('table')}: type={step.get('type')} "
+                          f"key={step.get('key')} rows={step.get('rows')}")
+                if step.get('type') != 'ALL' or rows is None or rows < min_rows:
+                    continue
+                if table in ACCEPTED_FULL_SCANS.get((module, function), ()):
+                    continue
+                problems.append((location, function, table, rows, sql))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+    print(f"[EXPLAIN] Checked {len(statements)} statements; "
+          f"{len(skipped)} built at runtime were skipped: {', '.join(skipped) or '-'}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail on full table scans in route SQL.")
+    parser.add_argument('--min-rows', type=int, default=10000,
+                        help="tables with fewer (estimated) rows may be scanned")
+    parser.add_argument('--verbose', action='store_true', help="print every plan step")
+    args = parser.parse_args()
+
+    problems = check(min_rows=args.min_rows, verbose=args.verbose)
+    for location, function, table, rows, sql in problems:
+        print(f"FAIL: {location} ({function}) scans all of {table} (~{rows} rows): {sql[:160]}")
+    if problems:
+        return 1
+    print("[EXPLAIN] No full table scans on large tables")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
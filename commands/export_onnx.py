@@ -0,0 +1,72 @@
+# app/commands/export_onnx.py
+"""
+Export all-MiniLM-L6-v2 to ONNX and quantize it to int8 for the onnx
+embedding backend (EMBEDDING_BACKEND=onnx, services/onnx_encoder.py).
+
+Usage:
+    python -m commands.export_onnx [--output-dir instance/onnx/all-MiniLM-L6-v2] [--opset 17]
+
+Writes model.onnx (fp32), model_int8.onnx (dynamic int8 quantization of
+the MatMul weights) and tokenizer.json to the output directory. Needs
+torch, sentence-transformers, onnx and onnxruntime; only onnxruntime and
+tokenizers are needed at serving time. Check the result with
+`python -m commands.bench_encoder`.
+"""
+import argparse
+import os
+
+from services.embeddings import MODEL_NAME
+from services.onnx_encoder import EMBEDDING_ONNX_DIR, MAX_SEQ_LENGTH
+
+
+def export_onnx(output_dir=EMBEDDING_ONNX_DIR, opset=17):
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(output_dir, exist_ok=True)
+    st_model = SentenceTransformer(MODEL_NAME, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    sample = tokenizer(["Name: Black wallet. Location: Library"], return_tensors='pt',
+                       padding=True, truncation=True, max_length=MAX_SEQ_LENGTH)
+    input_names = ['input_ids', 'attention_mask', 'token_type_ids']
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+    print(f"[ONNX] Exporting {MODEL_NAME} to {fp32_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True,
+            dynamo=False,
+        )
+
+    int8_path = os.path.join(output_dir, 'model_int8.onnx')
+    print(f"[ONNX] Quantizing to {int8_path}...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, 'tokenizer.json'))
+    for name in ('model.onnx', 'model_int8.onnx'):
+        size_mb = os.path.getsize(os.path.join(output_dir, name)) / (1024 * 1024)
+        print(f"[ONNX] {name}: {size_mb:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the sentence encoder to int8 ONNX.")
+    parser.add_argument('--output-dir', default=EMBEDDING_ONNX_DIR)
+    parser.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+    export_onnx(output_dir=args.output_dir, opset=args.opset)
+
+
+if __name__ == '__main__':
+    main()
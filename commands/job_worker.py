@@ -0,0 +1,98 @@
+# app/commands/job_worker.py
+"""
+Background worker for the jobs table (services/jobs.py).
+
+Usage:
+    python -m commands.job_worker            # run until SIGTERM/SIGINT
+    python -m commands.job_worker --once     # drain runnable jobs, then exit
+
+Embedding and matching run here instead of in the web request. While
+idle, the worker also delivers any notifications left in the outbox
+(e.g. after their dispatch job failed for good).
+"""
+import argparse
+import os
+import signal
+import socket
+import time
+
+import services.job_handlers  # noqa: F401  (registers the handlers)
+from services.jobs import claim_job, ensure_jobs_table, run_job
+from services.notification_outbox import dispatch_outbox
+from services.embeddings import EMBEDDING_SOCKET
+from services.warmup import server_reachable, warm_up
+
+POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+# At start, wait this long for the embedding server (which binds its socket only
+# once its model is loaded) so the first embed job does not load a second copy
+EMBEDDING_SERVER_WAIT_SECONDS = float(os.getenv('EMBEDDING_SERVER_WAIT_SECONDS', '180'))
+# How often an idle worker sweeps the notification outbox
+OUTBOX_SWEEP_SECONDS = float(os.getenv('OUTBOX_SWEEP_SECONDS', '60'))
+
+_stopping = False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+    print(f"[WORKER] Received signal {signum}, finishing current job...")
+
+
+def wait_for_embedding_server():
+    """Block until EMBEDDING_SOCKET answers, EMBEDDING_SERVER_WAIT_SECONDS pass or we are stopped."""
+    if not EMBEDDING_SOCKET:
+        return True
+    deadline = time.monotonic() + EMBEDDING_SERVER_WAIT_SECONDS
+    while not server_reachable():
+        if _stopping or time.monotonic() >= deadline:
+            print(f"[WORKER] Embedding server at {EMBEDDING_SOCKET} not reachable; starting anyway")
+            return False
+        time.sleep(POLL_SECONDS)
+    return True
+
+
+def run_worker(once=False):
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    ensure_jobs_table()
+    wait_for_embedding_server()
+    # Load the encoder and matching matrices before taking the first job
+    warm_up(matrices=True)
+    print(f"[WORKER] {worker_id} started")
+
+    last_sweep = time.monotonic()
+    while not _stopping:
+        try:
+            job = claim_job(worker_id)
+        except Exception as e:
+            print(f"[WORKER] ERROR claiming job: {e}")
+            time.sleep(POLL_SECONDS * 5)
+            continue
+
+        if job:
+            run_job(job)
+            continue
+
+        if once or time.monotonic() - last_sweep >= OUTBOX_SWEEP_SECONDS:
+            last_sweep = time.monotonic()
+            try:
+                dispatch_outbox()
+            except Exception as e:
+                print(f"[WORKER] ERROR sweeping notification outbox: {e}")
+        if once:
+            break
+        time.sleep(POLL_SECONDS)
+
+    print(f"[WORKER] {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs (embedding, matching).")
+    parser.add_argument('--once', action='store_true', help="exit when no runnable job is left")
+    args = parser.parse_args()
+    run_worker(once=args.once)
+
+
+if __name__ == '__main__':
+    main()
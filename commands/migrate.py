@@ -0,0 +1,39 @@
+# app/commands/migrate.py
+"""
+Apply the versioned schema migrations in schema/migrations.py.
+
+Usage:
+    python -m commands.migrate              # apply everything pending
+    python -m commands.migrate --status     # list migrations and when they ran
+    python -m commands.migrate --dry-run    # show what would run
+    python -m commands.migrate --to 3       # stop after version 3
+
+Creates the tables on an empty database and adds the missing indexes
+on an existing one. Safe to re-run; concurrent runs wait on a MySQL
+named lock.
+"""
+import argparse
+import sys
+
+from schema.migrations import migrate, migration_status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument('--status', action='store_true', help="list migrations and exit")
+    parser.add_argument('--dry-run', action='store_true', help="print pending migrations without running them")
+    parser.add_argument('--to', type=int, default=None, help="highest version to apply")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, applied_at in migration_status():
+            print(f"{version:>4}  {name:<28} {applied_at or 'pending'}")
+        return 0
+
+    applied = migrate(target=args.to, dry_run=args.dry_run)
+    print(f"[MIGRATE] Done: {len(applied)} migration(s) {'pending' if args.dry_run else 'applied'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+# app/commands/migrate_embeddings.py
+"""
+Convert stored embeddings from JSON text to packed binary vectors.
+
+Usage:
+    python -m commands.migrate_embeddings [--dtype float32|float16] [--batch-size 500]
+
+Step 1 changes the `embedding` columns of lost_items / found_items to
+MEDIUMBLOB (existing JSON text is kept byte-for-byte). Step 2 rewrites the
+rows in id order, in batches, using serialize_embedding(). The app reads
+both formats (services.embeddings.decode_embedding), so it is safe to run
+this while the site is up and to re-run it after an interruption.
+"""
+import argparse
+import time
+
+from db import get_db
+from services.embeddings import decode_embedding, is_binary_embedding, serialize_embedding
+
+TABLES = ('lost_items', 'found_items')
+BLOB_TYPES = ('blob', 'mediumblob', 'longblob')
+
+
+def ensure_blob_column(conn, table):
+    """ALTER the embedding column to MEDIUMBLOB if it is still a text type."""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT DATA_TYPE AS data_type
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = 'embedding'
+        """, (table,))
+        row = cur.fetchone()
+        if not row:
+            raise RuntimeError(f"{table}.embedding column not found")
+        if row['data_type'].lower() in BLOB_TYPES:
+            print(f"[MIGRATE] {table}.embedding is already {row['data_type']}")
+            return
+        print(f"[MIGRATE] Converting {table}.embedding from {row['data_type']} to MEDIUMBLOB...")
+        cur.execute(f"ALTER TABLE {table} MODIFY embedding MEDIUMBLOB NULL")
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def convert_table(conn, table, dtype='float32', batch_size=500):
+    """
+    Rewrite every non-binary embedding in `table` as a packed vector.
+
+    Returns:
+        tuple: (rows converted, rows skipped because they could not be decoded)
+    """
+    cur = conn.cursor()
+    last_id = 0
+    converted = 0
+    skipped = 0
+    started = time.time()
+    try:
+        while True:
+            cur.execute(f"""
+                SELECT id, embedding FROM {table}
+                WHERE id > %s AND embedding IS NOT NULL
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+
+            updates = []
+            for row in rows:
+                if is_binary_embedding(row['embedding'], dtype):
+                    continue
+                try:
+                    vec = decode_embedding(row['embedding'])
+                except (ValueError, TypeError):
+                    print(f"[MIGRATE] ERROR: Could not decode {table} id {row['id']}, leaving as is")
+                    skipped += 1
+                    continue
+                updates.append((serialize_embedding(vec, dtype=dtype), row['id']))
+
+            if updates:
+                cur.executemany(f"UPDATE {table} SET embedding = %s WHERE id = %s", updates)
+                conn.commit()
+                converted += len(updates)
+
+            print(f"[MIGRATE] {table}: up to id {last_id}, {converted} converted "
+                  f"({converted / max(time.time() - started, 1e-6):.0f} rows/s)")
+    finally:
+        cur.close()
+    return converted, skipped
+
+
+def migrate_embeddings(dtype='float32', batch_size=500):
+    conn = get_db()
+    try:
+        for table in TABLES:
+            ensure_blob_column(conn, table)
+            converted, skipped = convert_table(conn, table, dtype=dtype, batch_size=batch_size)
+            print(f"[MIGRATE] {table}: {converted} converted, {skipped} skipped")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON embeddings to packed binary vectors.")
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    migrate_embeddings(dtype=args.dtype, batch_size=args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
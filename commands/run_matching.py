@@ -1,7 +1,7 @@
 # app/commands/run_matching.py
-from services.matching import generate_matches, save_matches
+from services.matching import MATCH_FOUND_TOP_K, MATCH_TOP_K, generate_matches, save_matches
 
-def run_matching_job():
-    candidates = generate_matches(threshold=0.75)
-    save_matches(candidates)
-    return len(candidates)
+def run_matching_job(threshold=0.75, top_k=MATCH_TOP_K, found_top_k=MATCH_FOUND_TOP_K):
+    candidates = generate_matches(threshold=threshold, top_k=top_k, found_top_k=found_top_k)
+    counts = save_matches(candidates)
+    return {'matches': len(candidates), **counts}
@@ -1,18 +1,417 @@
 import pymysql
 import os
+import threading
+import time
+from contextlib import contextmanager
 
-def get_db():
+from flask import g, has_request_context, request
+from pymysql.constants import SERVER_STATUS
+
+from services.sql_profiler import SQL_PROFILING, ProfiledCursor, QueryStats, finish_request
+
+# Connection pool settings (DB_POOL_SIZE=0 opens a new connection per get_db() call)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+# Seconds get_db() waits for a free connection when all DB_POOL_SIZE are in use
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+# Idle connections older than this are closed instead of reused
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv('DB_POOL_MAX_IDLE_SECONDS', '300'))
+# Connections idle longer than this are pinged before being handed out
+DB_POOL_PING_AFTER_SECONDS = float(os.getenv('DB_POOL_PING_AFTER_SECONDS', '5'))
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+DB_READ_TIMEOUT = int(os.getenv('DB_READ_TIMEOUT', '30'))
+DB_WRITE_TIMEOUT = int(os.getenv('DB_WRITE_TIMEOUT', '30'))
+
+
+def connect():
     # Support both Railway's MySQL service variables and custom env vars
     db_host = os.getenv('MYSQL_HOST') or os.getenv('DB_HOST', 'localhost')
     db_user = os.getenv('MYSQL_USER') or os.getenv('DB_USER', 'root')
     db_pass = os.getenv('MYSQL_PASSWORD') or os.getenv('DB_PASS', '')
     db_name = os.getenv('MYSQL_DB') or os.getenv('DB_NAME', 'cap_finditfast')
-    
+
     return pymysql.connect(
         host=db_host,
         user=db_user,
         password=db_pass,
         database=db_name,
         charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=DB_CONNECT_TIMEOUT,
+        read_timeout=DB_READ_TIMEOUT,
+        write_timeout=DB_WRITE_TIMEOUT,
     )
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    """No pooled connection became free within DB_POOL_TIMEOUT."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PyMySQL connections.
+
+    Idle connections are kept in a LIFO stack, so the most recently used
+    one is reused and the rest age out after max_idle seconds. A
+    connection idle longer than ping_after is pinged on checkout and
+    replaced if the server dropped it. At most max_size connections are
+    open at once; further checkouts wait up to `timeout` seconds.
+    """
+
+    def __init__(self, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 max_idle=DB_POOL_MAX_IDLE_SECONDS, ping_after=DB_POOL_PING_AFTER_SECONDS):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self._idle = []            # [(raw connection, returned_at)]
+        self._open = 0
+        self._cond = threading.Condition()
+        self.metrics = {
+            'checkouts': 0, 'creations': 0, 'waits': 0, 'wait_seconds': 0.0, 'timeouts': 0,
+            'health_check_failures': 0, 'idle_evictions': 0, 'discarded': 0,
+        }
+
+    def _evict_idle(self, now):
+        """Close idle connections past max_idle (caller holds the lock)."""
+        keep = []
+        for raw, returned_at in self._idle:
+            if now - returned_at > self.max_idle:
+                self._close_quietly(raw)
+                self._open -= 1
+                self.metrics['idle_evictions'] += 1
+            else:
+                keep.append((raw, returned_at))
+        self._idle = keep
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _healthy(self, raw, idle_for):
+        if idle_for < self.ping_after:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            self.metrics['health_check_failures'] += 1
+            self._close_quietly(raw)
+            return False
+
+    def checkout(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    raw, returned_at = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    raw = None
+                    break
+                remaining = self.timeout - (now - started)
+                if remaining <= 0:
+                    self.metrics['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                      f"({self.max_size} in use)")
+                if not waited:
+                    waited = True
+                    self.metrics['waits'] += 1
+                self._cond.wait(remaining)
+            self.metrics['checkouts'] += 1
+            if waited:
+                self.metrics['wait_seconds'] += time.monotonic() - started
+
+        # Network I/O happens outside the lock
+        if raw is not None and not self._healthy(raw, time.monotonic() - returned_at):
+            raw = None
+        if raw is None:
+            try:
+                raw = connect()
+            except Exception:
+                self._release_slot()
+                raise
+            with self._cond:
+                self.metrics['creations'] += 1
+        return PooledConnection(self, raw)
+
+    def _release_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def checkin(self, raw):
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if raw.open and raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                raw.rollback()
+        except Exception:
+            self._close_quietly(raw)
+            with self._cond:
+                self.metrics['discarded'] += 1
+            self._release_slot()
+            return
+        if not raw.open:
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.metrics, wait_seconds=round(self.metrics['wait_seconds'], 3),
+                        max_size=self.max_size, open=self._open, idle=len(self._idle),
+                        in_use=self._open - len(self._idle))
+
+    def reset_after_fork(self):
+        # Inherited sockets belong to the parent; drop them without sending QUIT
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+
+class PooledConnection:
+    """
+    What get_db() returns: behaves like a PyMySQL connection, but close()
+    gives the connection back to the pool instead of disconnecting.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get('_raw')
+        if raw is None:
+            raise pymysql.err.InterfaceError("Connection was already returned to the pool")
+        return getattr(raw, name)
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.checkin(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Return connections leaked by code paths that never call close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+_pool = ConnectionPool() if DB_POOL_SIZE > 0 else None
+
+if _pool is not None and hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_pool.reset_after_fork)
+
+
+def _checkout():
+    if _pool is None:
+        return connect()
+    return _pool.checkout()
+
+
+class RequestConnection:
+    """
+    What get_db() returns inside a Flask request: one connection and one
+    transaction shared by every helper the request calls.
+
+    close() is a no-op and commit() only sets a savepoint; the real
+    COMMIT happens once in after_request (see init_app). rollback()
+    rolls back to the last savepoint, so a helper that undoes its own
+    failed write leaves the work committed by earlier helpers intact.
+    """
+
+    SAVEPOINT = 'request_uow'
+
+    def __init__(self, conn, stats=None):
+        self._conn = conn
+        self._savepoint = False
+        self.commits = 0
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        cur = self._conn.cursor(*args, **kwargs)
+        return ProfiledCursor(cur, self.stats) if self.stats is not None else cur
+
+    def commit(self):
+        if self._conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            with self._conn.cursor() as cur:
+                cur.execute(f"SAVEPOINT {self.SAVEPOINT}")
+            self._savepoint = True
+        self.commits += 1
+
+    def rollback(self):
+        if not self._savepoint:
+            self._conn.rollback()
+            return
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute(f"ROLLBACK TO SAVEPOINT {self.SAVEPOINT}")
+        except pymysql.err.OperationalError as e:
+            # The server already rolled the whole transaction back (deadlock, lock wait timeout)
+            print(f"[DB] Request transaction was rolled back by the server: {e}")
+            self._conn.rollback()
+            self._savepoint = False
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def finish(self, commit):
+        """Commit or roll back the request's transaction (called by init_app's hooks)."""
+        self._savepoint = False
+        if commit:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+
+    def release(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            conn.close()
+
+
+def _request_scoped():
+    return has_request_context() and not g.get('_db_unscoped', 0)
+
+
+def get_db(scoped=True):
+    """
+    Return a database connection.
+
+    Inside a Flask request this is the request's shared RequestConnection,
+    checked out on first use and returned to the pool at teardown.
+    Outside a request (job worker, commands, threads), with scoped=False
+    or inside `with unscoped():`, it is a connection of its own that the
+    caller commits and closes.
+    """
+    if not scoped or not _request_scoped():
+        return _checkout()
+    conn = g.get('_db_conn')
+    if conn is None:
+        stats = None
+        if SQL_PROFILING:
+            stats = g.get('_db_stats')
+            if stats is None:
+                stats = g._db_stats = QueryStats()
+        conn = g._db_conn = RequestConnection(_checkout(), stats)
+    return conn
+
+
+@contextmanager
+def unscoped():
+    """
+    Make get_db() hand out independent connections for the duration of
+    the block, for background work done inside a request (inline jobs)
+    that must commit on its own and not join the request's transaction.
+    """
+    if not has_request_context():
+        yield
+        return
+    g._db_unscoped = g.get('_db_unscoped', 0) + 1
+    try:
+        yield
+    finally:
+        g._db_unscoped -= 1
+
+
+def after_commit(func, *args, **kwargs):
+    """
+    Run func once the request's transaction has committed (right away
+    outside a request). It runs inside unscoped(), and is dropped if the
+    request rolls back.
+    """
+    if not _request_scoped():
+        return func(*args, **kwargs)
+    g.setdefault('_db_after_commit', []).append((func, args, kwargs))
+
+
+def release_request_connection(commit=True):
+    """
+    Commit (or roll back) the request's transaction now, return its
+    connection to the pool and run the after_commit callbacks.
+
+    Called for every request by after_request; streaming views call it
+    themselves so a long-lived response does not hold a pooled
+    connection. A later get_db() in the same request checks out a new one.
+    """
+    conn = g.pop('_db_conn', None)
+    callbacks = g.pop('_db_after_commit', [])
+    if conn is not None:
+        try:
+            started = time.perf_counter()
+            conn.finish(commit)
+            if conn.stats is not None:
+                conn.stats.record('COMMIT' if commit else 'ROLLBACK', time.perf_counter() - started,
+                                  'db.py (release_request_connection)')
+        finally:
+            conn.release()
+    if commit:
+        with unscoped():
+            for func, args, kwargs in callbacks:
+                try:
+                    func(*args, **kwargs)
+                except Exception as e:
+                    print(f"[DB] after_commit callback {getattr(func, '__name__', func)} failed: {e}")
+
+
+def _commit_request(response):
+    # Server errors roll back everything the request wrote
+    release_request_connection(commit=response.status_code < 500)
+    return response
+
+
+def _teardown_request(exc=None):
+    # Only reached with a connection if after_request did not run or failed
+    conn = g.pop('_db_conn', None)
+    g.pop('_db_after_commit', None)
+    if conn is None:
+        return
+    try:
+        conn.finish(commit=False)
+    except Exception as e:
+        print(f"[DB] Rollback at teardown failed: {e}")
+    finally:
+        conn.release()
+
+
+def _profile_request(response):
+    stats = g.pop('_db_stats', None)
+    if stats is None:
+        return response
+    return finish_request(stats, request, response)
+
+
+def init_app(app):
+    """Commit each request's shared connection after the view and release it at teardown."""
+    # after_request hooks run in reverse order: the profile is taken after the commit
+    app.after_request(_profile_request)
+    app.after_request(_commit_request)
+    app.teardown_request(_teardown_request)
+
+
+def pool_stats():
+    """Pool counters (checkouts, creations, waits, ...) or None if pooling is off."""
+    return _pool.stats() if _pool is not None else None
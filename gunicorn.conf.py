@@ -0,0 +1,39 @@
+# gunicorn.conf.py
+"""
+gunicorn settings: load the app and warm up the sentence encoder in the
+master before forking, so every worker shares the loaded model pages
+copy-on-write instead of loading its own copy on the first report.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+PRELOAD_MODEL=0 skips the warm-up. With EMBEDDING_SOCKET set the model
+lives in commands/embedding_server.py and the master only checks that it
+is reachable. Warm-up status is served at /healthz/ready.
+
+Workers are threaded (gthread): each open /notifications/stream holds a
+thread, not a whole worker process, while it waits for events. Streams
+are capped at SSE_MAX_STREAMS (16) per worker, so with the defaults
+(WEB_CONCURRENCY=2 x GUNICORN_THREADS=32) up to 32 tabs get live updates
+and at least 16 threads per worker stay free for pages; further tabs
+poll. To serve more live tabs, raise GUNICORN_THREADS together with
+SSE_MAX_STREAMS, keeping the gap at the number of page requests a worker
+should serve concurrently.
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+# Mostly idle notification streams; DB work is still capped per process by DB_POOL_SIZE
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+timeout = 120
+accesslog = '-'
+errorlog = '-'
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers are forked
+    if os.getenv('PRELOAD_MODEL', '1') == '1':
+        from services.warmup import warm_up
+        warm_up()
@@ -0,0 +1,335 @@
+#migrations.py
+"""
+Versioned schema migrations.
+
+Each entry of MIGRATIONS is (version, name, steps); a step is either a
+SQL string or a callable(cur). Applied versions are recorded in
+`schema_migrations`. MySQL commits DDL implicitly, so a migration cannot
+be rolled back half-way: every step is written to be idempotent
+(IF NOT EXISTS, ensure_index, ...) and a failed migration is simply
+re-run. Run with `python -m commands.migrate`.
+"""
+import hashlib
+import time
+
+from db import get_db
+from services.jobs import JOBS_TABLE_SQL
+from services.notification_outbox import OUTBOX_TABLE_SQL
+
+MIGRATIONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT UNSIGNED PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at DATETIME NOT NULL,
+    duration_ms INT UNSIGNED NOT NULL
+)
+"""
+
+# Serializes concurrent `migrate` runs (e.g. several containers starting at once)
+LOCK_NAME = 'schema_migrations'
+LOCK_TIMEOUT_SECONDS = 60
+
+BLOB_TYPES = ('blob', 'mediumblob', 'longblob')
+
+MATCH_PAIR_KEY = 'uq_matches_pair'
+
+
+# ---------------- Helpers used by the steps ----------------
+
+def index_exists(cur, table, name):
+    cur.execute("""
+        SELECT COUNT(*) AS n FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, name))
+    return cur.fetchone()['n'] > 0
+
+
+def column_type(cur, table, column):
+    cur.execute("""
+        SELECT DATA_TYPE AS data_type FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cur.fetchone()
+    return row['data_type'].lower() if row else None
+
+
+def ensure_index(table, name, columns, unique=False):
+    """
+    Build a step that adds an index unless one with that name exists.
+
+    The index is built online (ALGORITHM=INPLACE, LOCK=NONE), so the
+    table stays readable and writable while it is created.
+    """
+    def step(cur):
+        if index_exists(cur, table, name):
+            print(f"[MIGRATE]   {table}.{name} already exists")
+            return
+        kind = 'UNIQUE KEY' if unique else 'KEY'
+        print(f"[MIGRATE]   Adding {kind.lower()} {table}.{name} ({', '.join(columns)})")
+        cur.execute(f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(columns)}), "
+                    f"ALGORITHM=INPLACE, LOCK=NONE")
+    step.description = f"ensure_index {table}.{name} ({', '.join(columns)}){' UNIQUE' if unique else ''}"
+    return step
+
+
+def _embedding_blob_columns(cur):
+    # Column type only; commands.migrate_embeddings rewrites JSON rows to packed vectors
+    for table in ('lost_items', 'found_items'):
+        data_type = column_type(cur, table, 'embedding')
+        if data_type is None:
+            print(f"[MIGRATE]   Adding {table}.embedding MEDIUMBLOB")
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN embedding MEDIUMBLOB NULL")
+        elif data_type not in BLOB_TYPES:
+            print(f"[MIGRATE]   Converting {table}.embedding from {data_type} to MEDIUMBLOB")
+            cur.execute(f"ALTER TABLE {table} MODIFY embedding MEDIUMBLOB NULL")
+
+
+def _merge_duplicate_matches(cur):
+    # Keep the oldest row of each pair with the best score and move claims onto it
+    cur.execute("""
+        SELECT lost_item_id, found_item_id, MIN(id) AS keep_id, MAX(score) AS best_score
+        FROM matches
+        GROUP BY lost_item_id, found_item_id
+        HAVING COUNT(*) > 1
+    """)
+    groups = cur.fetchall() or []
+    removed = 0
+    for group in groups:
+        cur.execute("""
+            SELECT id FROM matches
+            WHERE lost_item_id = %s AND found_item_id = %s AND id <> %s
+        """, (group['lost_item_id'], group['found_item_id'], group['keep_id']))
+        extra_ids = [row['id'] for row in cur.fetchall()]
+        placeholders = ", ".join(["%s"] * len(extra_ids))
+        cur.execute(f"UPDATE claims SET match_id = %s WHERE match_id IN ({placeholders})",
+                    [group['keep_id'], *extra_ids])
+        cur.execute(f"DELETE FROM matches WHERE id IN ({placeholders})", extra_ids)
+        cur.execute("UPDATE matches SET score = %s WHERE id = %s",
+                    (group['best_score'], group['keep_id']))
+        removed += len(extra_ids)
+    print(f"[MIGRATE]   Merged {len(groups)} duplicated match pairs ({removed} extra rows)")
+
+
+def _unique_match_pairs(cur):
+    # services.matching.save_matches upserts on this key; existing duplicates
+    # would make adding it fail, so merge them first
+    if index_exists(cur, 'matches', MATCH_PAIR_KEY):
+        print(f"[MIGRATE]   matches.{MATCH_PAIR_KEY} already exists")
+        return
+    _merge_duplicate_matches(cur)
+    print(f"[MIGRATE]   Adding unique key matches.{MATCH_PAIR_KEY} (lost_item_id, found_item_id)")
+    cur.execute(f"ALTER TABLE matches ADD UNIQUE KEY {MATCH_PAIR_KEY} (lost_item_id, found_item_id)")
+
+
+# ---------------- Migrations ----------------
+
+MIGRATIONS = [
+    (1, 'base_tables', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(150) NOT NULL,
+            student_id VARCHAR(50) NULL,
+            email VARCHAR(191) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            profile_photo VARCHAR(255) NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'user',
+            active TINYINT(1) NOT NULL DEFAULT 1,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS lost_items (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            user_id INT UNSIGNED NOT NULL,
+            name VARCHAR(150) NOT NULL,
+            category VARCHAR(50) NULL,
+            description TEXT NULL,
+            last_seen VARCHAR(255) NULL,
+            last_seen_at DATETIME NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            photo VARCHAR(255) NULL,
+            reported_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            embedding MEDIUMBLOB NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS found_items (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            user_id INT UNSIGNED NOT NULL,
+            name VARCHAR(150) NOT NULL,
+            category VARCHAR(50) NULL,
+            description TEXT NULL,
+            where_found VARCHAR(255) NULL,
+            found_at DATETIME NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            photo VARCHAR(255) NULL,
+            reported_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            embedding MEDIUMBLOB NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS matches (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            lost_item_id INT UNSIGNED NOT NULL,
+            found_item_id INT UNSIGNED NOT NULL,
+            score FLOAT NOT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uq_matches_pair (lost_item_id, found_item_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS claims (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            match_id INT UNSIGNED NULL,
+            lost_item_id INT UNSIGNED NULL,
+            found_item_id INT UNSIGNED NULL,
+            user_id INT UNSIGNED NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+            justification TEXT NULL,
+            created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            user_id INT UNSIGNED NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            title VARCHAR(150) NOT NULL,
+            message TEXT NOT NULL,
+            related_id INT UNSIGNED NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            read_at DATETIME NULL
+        )
+        """,
+    ]),
+    (2, 'jobs_table', [JOBS_TABLE_SQL]),
+    (3, 'embedding_blob_columns', [_embedding_blob_columns]),
+    (4, 'unique_match_pairs', [_unique_match_pairs]),
+    (5, 'hot_query_indexes', [
+        # Login / registration lookups
+        ensure_index('users', 'idx_users_email', ['email']),
+        ensure_index('users', 'idx_users_student_id', ['student_id']),
+        # Admin id lookups for claim notifications
+        ensure_index('users', 'idx_users_role', ['role']),
+        # My items pages, admin reports (ORDER BY reported_at) and pending counts
+        ensure_index('lost_items', 'idx_lost_items_user_reported', ['user_id', 'reported_at']),
+        ensure_index('lost_items', 'idx_lost_items_status', ['status']),
+        ensure_index('found_items', 'idx_found_items_user_reported', ['user_id', 'reported_at']),
+        ensure_index('found_items', 'idx_found_items_status', ['status']),
+        # Matches of a found item (the unique pair key covers lost_item_id lookups)
+        ensure_index('matches', 'idx_matches_found', ['found_item_id']),
+        # Pending claim per match, claims per item / user, admin claim list by status
+        ensure_index('claims', 'idx_claims_match_status_created', ['match_id', 'status', 'created_at']),
+        ensure_index('claims', 'idx_claims_lost_created', ['lost_item_id', 'created_at']),
+        ensure_index('claims', 'idx_claims_found_created', ['found_item_id', 'created_at']),
+        ensure_index('claims', 'idx_claims_user_status', ['user_id', 'status']),
+        ensure_index('claims', 'idx_claims_status_created', ['status', 'created_at']),
+        # Unread counts and the notification dropdown / page
+        ensure_index('notifications', 'idx_notifications_user_read_created',
+                     ['user_id', 'read_at', 'created_at']),
+        ensure_index('notifications', 'idx_notifications_user_type', ['user_id', 'type']),
+    ]),
+    (6, 'notification_outbox', [OUTBOX_TABLE_SQL]),
+    (7, 'notification_page_index', [
+        # Read part of the notifications page (read_at IS NOT NULL) in created_at order;
+        # the unread part uses idx_notifications_user_read_created
+        ensure_index('notifications', 'idx_notifications_user_created', ['user_id', 'created_at']),
+    ]),
+]
+
+
+def _describe(step):
+    if callable(step):
+        return getattr(step, 'description', step.__name__)
+    return ' '.join(step.split())
+
+
+def checksum(steps):
+    """Fingerprint of a migration's steps, to spot migrations edited after they ran."""
+    return hashlib.sha256('\n'.join(_describe(step) for step in steps).encode('utf-8')).hexdigest()
+
+
+def applied_migrations(cur):
+    """Return {version: row} for every migration recorded in schema_migrations."""
+    cur.execute(MIGRATIONS_TABLE_SQL)
+    cur.execute("SELECT version, name, checksum, applied_at, duration_ms FROM schema_migrations")
+    return {row['version']: row for row in cur.fetchall() or []}
+
+
+def pending_migrations(applied, target=None):
+    return [m for m in sorted(MIGRATIONS, key=lambda m: m[0])
+            if m[0] not in applied and (target is None or m[0] <= target)]
+
+
+def migrate(target=None, dry_run=False):
+    """
+    Apply every pending migration up to `target` (all by default), in order.
+
+    Args:
+        target (int, optional): Highest version to apply
+        dry_run (bool): Only print what would run
+
+    Returns:
+        list: Versions applied (or that would be applied)
+    """
+    conn = get_db(scoped=False)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT GET_LOCK(%s, %s) AS got", (LOCK_NAME, LOCK_TIMEOUT_SECONDS))
+        if not cur.fetchone()['got']:
+            raise RuntimeError(f"Another migration run holds the '{LOCK_NAME}' lock")
+        try:
+            applied = applied_migrations(cur)
+            for version, name, steps in MIGRATIONS:
+                row = applied.get(version)
+                if row and row['checksum'] != checksum(steps):
+                    print(f"[MIGRATE] WARNING: migration {version} ({name}) changed after it was applied")
+
+            pending = pending_migrations(applied, target)
+            if not pending:
+                print("[MIGRATE] Schema is up to date")
+            for version, name, steps in pending:
+                print(f"[MIGRATE] {'Would apply' if dry_run else 'Applying'} {version}: {name}")
+                if dry_run:
+                    for step in steps:
+                        print(f"[MIGRATE]   {_describe(step)[:120]}")
+                    continue
+                started = time.perf_counter()
+                for step in steps:
+                    if callable(step):
+                        step(cur)
+                    else:
+                        cur.execute(step)
+                    conn.commit()
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                cur.execute("""
+                    INSERT INTO schema_migrations (version, name, checksum, applied_at, duration_ms)
+                    VALUES (%s, %s, %s, NOW(), %s)
+                """, (version, name, checksum(steps), duration_ms))
+                conn.commit()
+                print(f"[MIGRATE] Applied {version}: {name} in {duration_ms} ms")
+            return [version for version, _, _ in pending]
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def migration_status():
+    """Return [(version, name, applied_at or None)] for every known migration."""
+    conn = get_db(scoped=False)
+    cur = conn.cursor()
+    try:
+        applied = applied_migrations(cur)
+        conn.commit()
+        return [(version, name, applied[version]['applied_at'] if version in applied else None)
+                for version, name, _ in sorted(MIGRATIONS, key=lambda m: m[0])]
+    finally:
+        cur.close()
+        conn.close()
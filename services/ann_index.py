@@ -0,0 +1,250 @@
+#ann_index.py
+import os
+import numpy as np
+
+from services.similarity import normalize_rows
+
+# Below this many vectors the index stays flat (exact search)
+MIN_TRAIN_SIZE = 256
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over normalized vectors.
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    vectors in its `n_probe` closest clusters. Until MIN_TRAIN_SIZE vectors
+    are stored the index is a single flat list, i.e. exact search.
+
+    Deleted ids are tombstoned and dropped on the next compaction/retrain.
+    Each id may carry an opaque integer content version (see
+    services/item_index.py), saved with the index.
+    """
+
+    def __init__(self, dim, n_probe=8):
+        self.dim = dim
+        self.n_probe = n_probe
+        self.centroids = None          # (n_lists, dim) float32, None while flat
+        self.trained_size = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._size = 0                 # rows used in the arrays above
+        self._row_of = {}              # id -> row
+        self._list_rows = [[]]         # cluster -> rows
+        self.versions = {}             # id -> content version of its vector
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def __contains__(self, item_id):
+        return int(item_id) in self._row_of
+
+    def ids(self):
+        """Return the live ids in the index."""
+        return list(self._row_of)
+
+    @property
+    def n_lists(self):
+        return len(self._list_rows)
+
+    # ------------------------------------------------------------------ writes
+
+    def _grow(self, extra):
+        needed = self._size + extra
+        capacity = self._ids.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        self._ids = np.resize(self._ids, capacity)
+        self._lists = np.resize(self._lists, capacity)
+        self._deleted = np.resize(self._deleted, capacity)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+
+    def _assign(self, vectors):
+        if self.centroids is None:
+            return np.zeros(vectors.shape[0], dtype=np.int32)
+        return np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def insert(self, ids, vectors, versions=None):
+        """Add (or replace) vectors for the given ids, optionally with their content versions."""
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        vectors = normalize_rows(np.array(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        self.delete([i for i in ids.tolist() if i in self._row_of])
+
+        self._grow(len(ids))
+        start, end = self._size, self._size + len(ids)
+        lists = self._assign(vectors)
+        self._ids[start:end] = ids
+        self._vectors[start:end] = vectors
+        self._lists[start:end] = lists
+        self._deleted[start:end] = False
+        for offset, (item_id, lst) in enumerate(zip(ids.tolist(), lists.tolist())):
+            self._row_of[item_id] = start + offset
+            self._list_rows[lst].append(start + offset)
+        self._size = end
+        if versions is not None:
+            self.versions.update(zip(ids.tolist(), (int(v) for v in versions)))
+
+        if len(self) >= MIN_TRAIN_SIZE and len(self) >= 4 * max(self.trained_size, MIN_TRAIN_SIZE // 4):
+            self.train()
+
+    def delete(self, ids):
+        """Tombstone the given ids (unknown ids are ignored)."""
+        removed = 0
+        for item_id in ids:
+            row = self._row_of.pop(int(item_id), None)
+            self.versions.pop(int(item_id), None)
+            if row is not None:
+                self._deleted[row] = True
+                removed += 1
+        if self._size and (self._size - len(self)) > max(64, self._size // 3):
+            self.compact()
+        return removed
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the inverted lists."""
+        live = np.nonzero(~self._deleted[:self._size])[0]
+        self._ids = self._ids[live].copy()
+        self._vectors = self._vectors[live].copy()
+        self._lists = self._lists[live].copy()
+        self._deleted = np.zeros(len(live), dtype=bool)
+        self._size = len(live)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        n_lists = 1 if self.centroids is None else self.centroids.shape[0]
+        self._list_rows = [[] for _ in range(n_lists)]
+        self._row_of = {}
+        for row in range(self._size):
+            if self._deleted[row]:
+                continue
+            self._row_of[int(self._ids[row])] = row
+            self._list_rows[int(self._lists[row])].append(row)
+
+    def train(self, n_lists=None, iterations=10, seed=0):
+        """
+        Cluster the stored vectors with spherical k-means and reassign them.
+
+        Args:
+            n_lists (int, optional): Number of clusters (default ~sqrt(N))
+            iterations (int): k-means iterations
+            seed (int): Random seed for centroid initialisation
+        """
+        self.compact()
+        n = self._size
+        if n < MIN_TRAIN_SIZE:
+            self.centroids = None
+            self.trained_size = 0
+            self._lists[:n] = 0
+            self._rebuild_lists()
+            return
+
+        n_lists = n_lists or max(2, int(np.sqrt(n)))
+        n_lists = min(n_lists, n)
+        data = self._vectors[:n]
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(n, n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters with random points
+                sums[empty] = data[rng.choice(n, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids.astype(np.float32)
+        self._lists[:n] = self._assign(data)
+        self.trained_size = n
+        self._rebuild_lists()
+
+    # ----------------------------------------------------------------- queries
+
+    def search(self, query, k=10, threshold=None, n_probe=None):
+        """
+        Find the nearest stored vectors to one query vector.
+
+        Args:
+            query (array-like): Query embedding (need not be normalized)
+            k (int, optional): Max results; None returns every hit above threshold
+            threshold (float, optional): Minimum cosine similarity
+            n_probe (int, optional): Clusters to scan (defaults to self.n_probe)
+
+        Returns:
+            list: (id, score) tuples, best first
+        """
+        if not len(self):
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(1, self.dim).copy()
+        q = normalize_rows(q)[0]
+
+        if self.centroids is None:
+            probe = [0]
+        else:
+            n_probe = min(n_probe or self.n_probe, self.centroids.shape[0])
+            probe = np.argpartition(-(self.centroids @ q), n_probe - 1)[:n_probe].tolist()
+
+        rows = np.fromiter((r for p in probe for r in self._list_rows[p]), dtype=np.int64)
+        if rows.size == 0:
+            return []
+        rows = rows[~self._deleted[rows]]
+        scores = self._vectors[rows] @ q
+
+        if threshold is not None:
+            keep = scores >= threshold
+            rows, scores = rows[keep], scores[keep]
+        if k is not None and scores.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+
+        order = np.argsort(-scores, kind='stable')
+        return [(int(self._ids[rows[i]]), float(scores[i])) for i in order]
+
+    def search_many(self, queries, k=10, threshold=None, n_probe=None):
+        """Run search() for each row of `queries`."""
+        return [self.search(q, k=k, threshold=threshold, n_probe=n_probe) for q in queries]
+
+    # ------------------------------------------------------------- persistence
+
+    def save(self, path):
+        """Write the index atomically to `path` (.npz)."""
+        self.compact()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Several processes may save the same index; each writes its own temp file
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            version_ids=np.fromiter(self.versions.keys(), dtype=np.int64, count=len(self.versions)),
+            version_values=np.fromiter(self.versions.values(), dtype=np.int64, count=len(self.versions)),
+            meta=np.array([self.dim, self.n_probe, self.trained_size], dtype=np.int64),
+            ids=self._ids[:self._size],
+            vectors=self._vectors[:self._size],
+            lists=self._lists[:self._size],
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save()."""
+        with np.load(path) as data:
+            dim, n_probe, trained_size = (int(x) for x in data['meta'])
+            index = cls(dim, n_probe=n_probe)
+            index.trained_size = trained_size
+            index.centroids = data['centroids'] if data['centroids'].shape[0] else None
+            index._ids = data['ids'].astype(np.int64)
+            index._vectors = data['vectors'].astype(np.float32)
+            index._lists = data['lists'].astype(np.int32)
+            if 'version_ids' in data.files:
+                index.versions = dict(zip(data['version_ids'].tolist(), data['version_values'].tolist()))
+        index._size = index._ids.shape[0]
+        index._deleted = np.zeros(index._size, dtype=bool)
+        index._rebuild_lists()
+        return index
@@ -0,0 +1,201 @@
+#embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# Two-tier cache of computed embeddings keyed by model + text
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', '1') == '1'
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv('EMBEDDING_CACHE_MEMORY_ITEMS', '4096'))
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join('instance', 'embedding_cache.sqlite3'))
+# 0 disables the disk tier
+EMBEDDING_CACHE_DISK_ITEMS = int(os.getenv('EMBEDDING_CACHE_DISK_ITEMS', '200000'))
+
+# Check the disk tier's size every this many writes
+_EVICT_CHECK_EVERY = 256
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace so trivially different texts share a key."""
+    return " ".join(unicodedata.normalize('NFC', text).split())
+
+
+def cache_key(model_name, text):
+    """sha256 of the model name and the normalized text."""
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Embedding cache with an in-process LRU tier and a shared sqlite tier.
+
+    The memory tier is an OrderedDict of at most `memory_items` vectors.
+    The disk tier is a sqlite table of float32 blobs that survives
+    restarts and is shared by every process using the same file; when it
+    grows past `disk_items` rows, the least recently used ~10% are
+    deleted.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, memory_items=EMBEDDING_CACHE_MEMORY_ITEMS,
+                 disk_items=EMBEDDING_CACHE_DISK_ITEMS):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    # ------------------------------------------------------------- disk tier
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _disk_get_many(self, keys):
+        if not self.disk_items or not keys:
+            return {}
+        found = {}
+        try:
+            conn = self._db()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join(['?'] * len(chunk))})", chunk
+                ).fetchall()
+                found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+            if found:
+                now = time.time()
+                conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                 [(now, key) for key in found])
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"[EMBED CACHE] ERROR reading {self.path}: {e}")
+        return found
+
+    def _disk_put_many(self, items):
+        if not self.disk_items or not items:
+            return
+        try:
+            conn = self._db()
+            now = time.time()
+            conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                             [(key, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items])
+            conn.commit()
+            self._writes += len(items)
+            if self._writes >= _EVICT_CHECK_EVERY:
+                self._writes = 0
+                self._evict_disk(conn)
+        except sqlite3.Error as e:
+            print(f"[EMBED CACHE] ERROR writing {self.path}: {e}")
+
+    def _evict_disk(self, conn):
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.disk_items:
+            return
+        drop = count - int(self.disk_items * 0.9)
+        conn.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+            )
+        """, (drop,))
+        conn.commit()
+        self.counters['evictions'] += drop
+        print(f"[EMBED CACHE] Evicted {drop} embeddings from {self.path}")
+
+    # ----------------------------------------------------------- memory tier
+
+    def _remember(self, key, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    # ---------------------------------------------------------------- public
+
+    def get_many(self, model_name, texts):
+        """
+        Look up embeddings for texts.
+
+        Returns:
+            dict: text -> float32 vector for every text that was cached
+        """
+        keys = {text: cache_key(model_name, text) for text in texts}
+        found = {}
+        missing = []
+        with self._lock:
+            for text, key in keys.items():
+                vector = self._memory.get(key)
+                if vector is None:
+                    missing.append(key)
+                else:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+            self.counters['memory_hits'] += len(found)
+
+        on_disk = self._disk_get_many(missing)
+        for text, key in keys.items():
+            if key in on_disk:
+                found[text] = on_disk[key]
+                self._remember(key, on_disk[key])
+        self.counters['disk_hits'] += len(on_disk)
+        self.counters['misses'] += len(keys) - len(found)
+        return found
+
+    def get(self, model_name, text):
+        return self.get_many(model_name, [text]).get(text)
+
+    def put_many(self, model_name, embeddings):
+        """Store {text: vector} in both tiers."""
+        items = []
+        for text, vector in embeddings.items():
+            key = cache_key(model_name, text)
+            vector = np.asarray(vector, dtype=np.float32)
+            self._remember(key, vector)
+            items.append((key, vector))
+        self._disk_put_many(items)
+
+    def put(self, model_name, text, vector):
+        self.put_many(model_name, {text: vector})
+
+    def stats(self):
+        """Counters plus the current memory tier size and hit rate."""
+        lookups = self.counters['memory_hits'] + self.counters['disk_hits'] + self.counters['misses']
+        hits = lookups - self.counters['misses']
+        return dict(self.counters, memory_items=len(self._memory),
+                    hit_rate=round(hits / lookups, 4) if lookups else None)
+
+
+_cache = None
+
+
+def get_cache():
+    """Return the process-wide cache, or None if EMBEDDING_CACHE_ENABLED is off."""
+    global _cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = EmbeddingCache()
+    return _cache
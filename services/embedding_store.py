@@ -0,0 +1,286 @@
+#embedding_store.py
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.similarity import normalize_rows
+
+# Shared on-disk vector store, one directory per table ('lost' / 'found')
+EMBEDDING_STORE_ENABLED = os.getenv('EMBEDDING_STORE_ENABLED', '1') == '1'
+EMBEDDING_STORE_DIR = os.getenv('EMBEDDING_STORE_DIR', os.path.join('instance', 'embedding_store'))
+
+# Compact once more than this share of rows are tombstoned
+COMPACT_RATIO = 0.5
+
+# meta.json layout with generation-suffixed data files. Stores in the older
+# layout are treated as empty and refilled from MySQL by the callers' sync.
+STORE_LAYOUT = 2
+DATA_FILES = (('vectors', 'f32'), ('ids', 'i64'), ('tombstones', 'u8'))
+
+
+class EmbeddingStore:
+    """
+    Append-only, memory-mapped store of normalized float32 vectors.
+
+    Files in `path` (<g> is the generation):
+        vectors.<g>.f32     contiguous (count, dim) float32 matrix
+        ids.<g>.i64         item id of each row
+        tombstones.<g>.u8   1 if the row was deleted or superseded
+        meta.json           {"dim", "count", "generation", "layout"}; written
+                            last, so a row only becomes visible once it is
+                            fully on disk
+        store.lock          flock() taken by writers
+
+    Readers map the files read-only, so every process (gunicorn worker,
+    job worker) shares the same page-cached copy. Writers in any process
+    serialise on the lock; readers pick up new rows on the next refresh().
+    Compaction writes a complete new generation and then swaps meta.json,
+    so a reader always maps files of one generation together.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dim = None
+        self.count = 0
+        self.generation = 0
+        self._meta_mtime = False       # never equal to a stat() result
+        self._vectors = None
+        self._ids = None
+        self._tombstones = None
+        self._row_of = {}
+        self._lock = threading.RLock()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _data_file(self, name, generation=None):
+        """Path of a data file ('vectors' / 'ids' / 'tombstones') of a generation (default: current)."""
+        generation = self.generation if generation is None else generation
+        ext = dict(DATA_FILES)[name]
+        return self._file(f"{name}.{generation}.{ext}")
+
+    # ------------------------------------------------------------------ reads
+
+    def _read_meta(self):
+        try:
+            with open(self._file('meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return {'dim': None, 'count': 0, 'generation': 0}
+        if meta.get('layout') != STORE_LAYOUT:
+            # Start a fresh generation rather than reading the old unsuffixed files
+            return {'dim': None, 'count': 0, 'generation': meta.get('generation', 0) + 1}
+        return meta
+
+    def refresh(self, force=False):
+        """Re-map the files if another process appended or compacted."""
+        with self._lock:
+            for attempt in range(3):
+                try:
+                    st = os.stat(self._file('meta.json'))
+                    mtime = (st.st_ino, st.st_mtime_ns)
+                except FileNotFoundError:
+                    mtime = None
+                if not force and mtime == self._meta_mtime:
+                    return
+                try:
+                    self._map(self._read_meta())
+                except FileNotFoundError:
+                    # A compaction removed this generation between reading meta.json and
+                    # mapping its files; meta.json already names the new one
+                    force = True
+                    continue
+                self._meta_mtime = mtime
+                return
+            raise RuntimeError(f"Embedding store {self.path} kept changing while being mapped")
+
+    def _map(self, meta):
+        dim, count, generation = meta['dim'], meta['count'], meta['generation']
+        if not count:
+            vectors = np.zeros((0, dim or 0), dtype=np.float32)
+            ids = np.zeros(0, dtype=np.int64)
+            tombstones = np.zeros(0, dtype=np.uint8)
+        else:
+            vectors = np.memmap(self._data_file('vectors', generation), dtype=np.float32, mode='r',
+                                shape=(count, dim))
+            ids = np.memmap(self._data_file('ids', generation), dtype=np.int64, mode='r', shape=(count,))
+            tombstones = np.memmap(self._data_file('tombstones', generation), dtype=np.uint8, mode='r',
+                                   shape=(count,))
+        self.dim, self.count, self.generation = dim, count, generation
+        self._vectors, self._ids, self._tombstones = vectors, ids, tombstones
+        # Later rows supersede earlier ones for the same id
+        self._row_of = {int(item_id): row for row, item_id in enumerate(ids.tolist())}
+
+    def __len__(self):
+        self.refresh()
+        return int(self.count - np.count_nonzero(self._tombstones[:self.count]))
+
+    def live_ids(self):
+        """Return the ids that currently have a live row."""
+        self.refresh()
+        return [item_id for item_id, row in self._row_of.items() if not self._tombstones[row]]
+
+    def get(self, item_id):
+        """Return the vector for one id (a read-only view) or None."""
+        self.refresh()
+        row = self._row_of.get(int(item_id))
+        if row is None or self._tombstones[row]:
+            return None
+        return self._vectors[row]
+
+    def get_matrix(self, ids=None):
+        """
+        Return (ids, matrix) of live vectors.
+
+        With ids=None and no tombstones the matrix is the memory map itself
+        (zero-copy); otherwise the requested rows are gathered.
+        """
+        self.refresh()
+        if ids is None:
+            live = np.nonzero(self._tombstones[:self.count] == 0)[0]
+            if live.size == self.count:
+                return self._ids.tolist(), self._vectors
+            return self._ids[live].tolist(), self._vectors[live]
+
+        rows = []
+        found_ids = []
+        for item_id in ids:
+            row = self._row_of.get(int(item_id))
+            if row is not None and not self._tombstones[row]:
+                rows.append(row)
+                found_ids.append(item_id)
+        return found_ids, self._vectors[np.asarray(rows, dtype=np.int64)]
+
+    # ----------------------------------------------------------------- writes
+
+    @contextmanager
+    def _writer(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(self._file('store.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh(force=True)
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_meta(self, dim, count, generation):
+        tmp_path = self._file('meta.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'dim': dim, 'count': count, 'generation': generation, 'layout': STORE_LAYOUT}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file('meta.json'))
+
+    def _set_tombstones(self, rows):
+        if not rows:
+            return
+        with open(self._data_file('tombstones'), 'r+b') as f:
+            for row in sorted(rows):
+                f.seek(row)
+                f.write(b'\x01')
+
+    def put(self, ids, vectors):
+        """Append vectors for ids, tombstoning any older rows for the same ids."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        vectors = np.array(vectors, dtype=np.float32).reshape(len(ids), -1)
+        # Keep only the last vector given for a repeated id
+        last = {item_id: pos for pos, item_id in enumerate(ids)}
+        if len(last) != len(ids):
+            keep = sorted(last.values())
+            ids, vectors = [ids[p] for p in keep], vectors[keep]
+        vectors = normalize_rows(vectors)
+        with self._writer():
+            dim = self.dim or vectors.shape[1]
+            if vectors.shape[1] != dim:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match store dimension {dim}")
+
+            count = self.count
+            # Drop any partial rows left by a writer that crashed before updating meta.json
+            for name, itemsize in (('vectors', 4 * dim), ('ids', 8), ('tombstones', 1)):
+                with open(self._data_file(name), 'ab') as f:
+                    f.truncate(count * itemsize)
+
+            self._set_tombstones([self._row_of[i] for i in ids if i in self._row_of])
+            with open(self._data_file('vectors'), 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self._data_file('ids'), 'ab') as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+            with open(self._data_file('tombstones'), 'ab') as f:
+                f.write(bytes(len(ids)))
+            self._write_meta(dim, count + len(ids), self.generation)
+            self.refresh(force=True)
+
+    def delete(self, ids):
+        """Tombstone the rows for ids; returns how many were live."""
+        with self._writer():
+            rows = [self._row_of[int(i)] for i in ids
+                    if int(i) in self._row_of and not self._tombstones[self._row_of[int(i)]]]
+            self._set_tombstones(rows)
+            dead = int(np.count_nonzero(self._tombstones[:self.count]))
+            if self.count and dead > self.count * COMPACT_RATIO:
+                self._compact()
+            return len(rows)
+
+    def _start_generation(self, generation, data):
+        """
+        Write complete data files for a new generation, then point meta.json
+        at it (caller holds the writer lock). Readers keep using their
+        current maps until they refresh; files two generations old are
+        removed, so one that is still being mapped stays readable.
+        """
+        for name, values in data.items():
+            with open(self._data_file(name, generation), 'wb') as f:
+                f.write(values.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        dim = self.dim if data['ids'].size else None
+        self._write_meta(dim, int(data['ids'].size), generation)
+        self._remove_generations_before(generation - 1)
+        self.refresh(force=True)
+
+    def _remove_generations_before(self, generation):
+        for entry in os.listdir(self.path):
+            parts = entry.split('.')
+            # Also drops the unsuffixed files of the older layout
+            legacy = len(parts) == 2 and tuple(parts) in DATA_FILES
+            if legacy or (len(parts) == 3 and (parts[0], parts[2]) in DATA_FILES and parts[1].isdigit()
+                          and int(parts[1]) < generation):
+                try:
+                    os.remove(self._file(entry))
+                except OSError:
+                    pass
+
+    def _compact(self):
+        """Rewrite the live rows as a new generation (caller holds the writer lock)."""
+        live = np.nonzero(self._tombstones[:self.count] == 0)[0]
+        self._start_generation(self.generation + 1, {
+            'vectors': np.array(self._vectors[live]),
+            'ids': np.array(self._ids[live]),
+            'tombstones': np.zeros(len(live), dtype=np.uint8),
+        })
+
+    def replace_all(self, ids, vectors):
+        """Rebuild the store from scratch with the given vectors."""
+        with self._writer():
+            self._start_generation(self.generation + 1, {
+                'vectors': np.zeros(0, dtype=np.float32),
+                'ids': np.zeros(0, dtype=np.int64),
+                'tombstones': np.zeros(0, dtype=np.uint8),
+            })
+        self.put(ids, vectors)
+
+_stores = {}
+
+
+def get_store(kind):
+    """Return the shared store for 'lost' or 'found' item embeddings."""
+    if kind not in _stores:
+        _stores[kind] = EmbeddingStore(os.path.join(EMBEDDING_STORE_DIR, kind))
+    return _stores[kind]
@@ -1,24 +1,207 @@
 #embeddings.py
-from sentence_transformers import SentenceTransformer
 import json
+import os
+import socket
+import struct
+import time
+import numpy as np
+
+from services.embedding_cache import get_cache, normalize_text
 
 # Global model variable - lazy loaded
 _model = None
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Encoder backend: 'torch' (sentence-transformers) or 'onnx' (int8 onnxruntime
+# export from commands/export_onnx.py, see services/onnx_encoder.py)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+# Storage format for new embeddings: 'float32', 'float16' or 'json'. Unset =
+# 'float32' once the embedding columns are BLOB (schema migration 3 or
+# commands/migrate_embeddings.py), 'json' before that (see storage_dtype()).
+EMBEDDING_DTYPE = os.getenv('EMBEDDING_DTYPE', '')
+
+# Texts per model.encode() call in the batch APIs
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+
+# Unix socket of the shared embedding server (commands/embedding_server.py).
+# Empty = always encode in this process.
+EMBEDDING_SOCKET = os.getenv('EMBEDDING_SOCKET', '')
+EMBEDDING_SOCKET_TIMEOUT = float(os.getenv('EMBEDDING_SOCKET_TIMEOUT', '30'))
+# After a failed call, encode in-process for this long before trying the socket again
+EMBEDDING_SOCKET_RETRY_SECONDS = 30
+# Opt-in: never fall back to an in-process model; raise EmbeddingServerUnavailable
+# instead (e.g. for the job worker, whose jobs then retry with the queue's backoff)
+EMBEDDING_REMOTE_ONLY = os.getenv('EMBEDDING_REMOTE_ONLY', '0') == '1'
+
+_socket_down_until = 0
+_storage_dtype = None
+
+# Binary vectors are stored as: magic byte + numpy dtype char + little-endian payload.
+# JSON text always starts with '[', so both formats can be told apart on read.
+_BINARY_MAGIC = b'\x93'
+_BINARY_DTYPES = {
+    'float32': (b'f', np.dtype('<f4')),
+    'float16': (b'e', np.dtype('<f2')),
+}
+_BINARY_CODES = {code: dtype for code, dtype in _BINARY_DTYPES.values()}
+
+
+class EmbeddingServerUnavailable(RuntimeError):
+    """EMBEDDING_SOCKET is set but the embedding server did not answer."""
+
+def load_encoder(backend=None):
+    """
+    Build a sentence encoder for the given backend.
+    
+    Both backends expose encode(texts, batch_size=...) and
+    get_sentence_embedding_dimension().
+    
+    Args:
+        backend (str, optional): 'torch' or 'onnx' (defaults to EMBEDDING_BACKEND)
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend == 'onnx':
+        from services.onnx_encoder import OnnxSentenceEncoder
+        print("Loading ONNX sentence encoder...")
+        return OnnxSentenceEncoder()
+    if backend != 'torch':
+        raise ValueError(f"Unsupported embedding backend: {backend}")
+    from sentence_transformers import SentenceTransformer
+    print("Loading sentence transformer model...")
+    return SentenceTransformer(MODEL_NAME)
 
 def get_model():
     """Lazy load the model only when first needed."""
     global _model
     if _model is None:
-        print("Loading sentence transformer model...")
-        _model = SentenceTransformer('all-MiniLM-L6-v2')
+        _model = load_encoder()
     return _model
 
+def encoder_name():
+    """Model + backend label; cached vectors are only reused for the same encoder."""
+    if EMBEDDING_BACKEND == 'onnx':
+        from services.onnx_encoder import EMBEDDING_ONNX_FILE
+        return f"{MODEL_NAME}:onnx:{EMBEDDING_ONNX_FILE}"
+    return MODEL_NAME
+
 def compute_embedding(text: str):
     """Return embedding as a Python list for DB storage (JSON)."""
     if not text:
         return None
-    model = get_model()
-    return model.encode(text).tolist()
+    return compute_embeddings_batch([text])[0]
+
+def compute_embeddings_batch(texts, batch_size=None):
+    """
+    Encode many texts with batched model.encode() calls.
+    
+    Texts already in the embedding cache (services/embedding_cache.py)
+    are not sent to the model; texts are whitespace-normalized first and
+    duplicates within `texts` are encoded once. With EMBEDDING_SOCKET set
+    the rest go to the shared embedding server, falling back to the
+    in-process model if it cannot be reached (unless EMBEDDING_REMOTE_ONLY).
+    
+    Args:
+        texts (list): Strings to encode; empty ones get None
+        batch_size (int, optional): Texts per forward pass (defaults to EMBEDDING_BATCH_SIZE)
+    
+    Returns:
+        list: One embedding list (or None) per input text
+    """
+    texts = [normalize_text(text) if text else None for text in texts]
+    unique = list(dict.fromkeys(text for text in texts if text))
+    if not unique:
+        return [None] * len(texts)
+    
+    cache = get_cache()
+    vectors = cache.get_many(encoder_name(), unique) if cache else {}
+    todo = [text for text in unique if text not in vectors]
+    if todo:
+        encoded = dict(zip(todo, _encode(todo, batch_size)))
+        if cache:
+            cache.put_many(encoder_name(), encoded)
+        vectors.update(encoded)
+    return [vectors[text].tolist() if text else None for text in texts]
+
+def _use_socket():
+    return bool(EMBEDDING_SOCKET) and (EMBEDDING_REMOTE_ONLY or time.time() >= _socket_down_until)
+
+def _socket_failed(error):
+    """Give up on the server for EMBEDDING_SOCKET_RETRY_SECONDS, or re-raise if remote-only."""
+    global _socket_down_until
+    if EMBEDDING_REMOTE_ONLY:
+        raise error
+    print(f"[EMBED] Encoding in-process for the next {EMBEDDING_SOCKET_RETRY_SECONDS}s")
+    _socket_down_until = time.time() + EMBEDDING_SOCKET_RETRY_SECONDS
+
+def _encode(texts, batch_size=None):
+    if _use_socket():
+        try:
+            return encode_remote(texts)
+        except EmbeddingServerUnavailable as e:
+            _socket_failed(e)
+    return get_model().encode(texts, batch_size=batch_size or EMBEDDING_BATCH_SIZE)
+
+def send_message(sock, header, payload=b''):
+    """Write one frame: 4-byte header length, JSON header, raw payload."""
+    header = dict(header, payload_bytes=len(payload))
+    data = json.dumps(header).encode('utf-8')
+    sock.sendall(struct.pack('>I', len(data)) + data + payload)
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def recv_message(sock):
+    """Read one frame written by send_message(); returns (header, payload)."""
+    (length,) = struct.unpack('>I', _recv_exact(sock, 4))
+    header = json.loads(_recv_exact(sock, length))
+    return header, _recv_exact(sock, header.get('payload_bytes', 0))
+
+def encode_remote(texts):
+    """
+    Encode texts on the embedding server over EMBEDDING_SOCKET.
+    
+    Returns:
+        np.ndarray: (len(texts), dim) float32 matrix
+    
+    Raises:
+        EmbeddingServerUnavailable: The server is not configured, not
+            listening yet (e.g. still loading the model) or failed
+    """
+    if not EMBEDDING_SOCKET:
+        raise EmbeddingServerUnavailable("EMBEDDING_SOCKET is not set")
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(EMBEDDING_SOCKET_TIMEOUT)
+            sock.connect(EMBEDDING_SOCKET)
+            send_message(sock, {'texts': texts})
+            header, payload = recv_message(sock)
+        if not header.get('ok'):
+            raise RuntimeError(header.get('error', 'unknown error'))
+        return np.frombuffer(payload, dtype='<f4').reshape(len(texts), header['dim'])
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"[EMBED] Embedding server unavailable at {EMBEDDING_SOCKET}: {e}")
+        raise EmbeddingServerUnavailable(str(e)) from e
+
+def embedding_dimension():
+    """
+    Dimension of the current encoder. With EMBEDDING_SOCKET set it comes
+    from the server's reply to an empty batch, so the model is only loaded
+    in this process if the server cannot be reached.
+    """
+    if _use_socket():
+        try:
+            return encode_remote([]).shape[1]
+        except EmbeddingServerUnavailable as e:
+            _socket_failed(e)
+    return get_model().get_sentence_embedding_dimension()
 
 def embed_tensor(text: str):
     """Return embedding as a tensor for similarity calculations."""
@@ -27,13 +210,84 @@ def embed_tensor(text: str):
     model = get_model()
     return model.encode(text, convert_to_tensor=True)
 
-def serialize_embedding(embedding_list):
-    """Convert list to JSON string for DB storage."""
-    return json.dumps(embedding_list)
+def storage_dtype():
+    """
+    Format new embeddings are written in: EMBEDDING_DTYPE if set, otherwise
+    'float32' when both embedding columns are BLOB and 'json' while either
+    is still a text column (packed bytes would be mangled by its charset).
+    The columns are checked once per process; restart after migrating.
+    """
+    global _storage_dtype
+    if EMBEDDING_DTYPE:
+        return EMBEDDING_DTYPE
+    if _storage_dtype is None:
+        from db import get_db
+        from schema.migrations import BLOB_TYPES, column_type
 
-def deserialize_embedding(embedding_json):
-    """Convert JSON string back to Python list."""
-    return json.loads(embedding_json)
+        conn = get_db()
+        cur = conn.cursor()
+        try:
+            types = {table: column_type(cur, table, 'embedding') for table in ('lost_items', 'found_items')}
+        except Exception as e:
+            # Not cached, so the next call checks again
+            print(f"[EMBEDDINGS] Could not read the embedding column types ({e}); writing JSON")
+            return 'json'
+        finally:
+            cur.close()
+            conn.close()
+        _storage_dtype = 'float32' if all(t in BLOB_TYPES for t in types.values()) else 'json'
+        print(f"[EMBEDDINGS] Embedding columns are {types}; storing new embeddings as {_storage_dtype}")
+    return _storage_dtype
+
+def serialize_embedding(embedding_list, dtype=None):
+    """
+    Convert an embedding to its DB storage format.
+    
+    Args:
+        embedding_list (list or np.ndarray): Embedding vector
+        dtype (str, optional): 'float32', 'float16' or 'json' (defaults to storage_dtype())
+    
+    Returns:
+        bytes or str: Packed binary vector, or JSON string when dtype is 'json'
+    """
+    dtype = dtype or storage_dtype()
+    if dtype == 'json':
+        return json.dumps([float(x) for x in embedding_list])
+    if dtype not in _BINARY_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    code, np_dtype = _BINARY_DTYPES[dtype]
+    return _BINARY_MAGIC + code + np.asarray(embedding_list, dtype=np_dtype).tobytes()
+
+def is_binary_embedding(raw, dtype=None):
+    """True if raw is a packed binary vector (optionally of the given dtype)."""
+    if not isinstance(raw, (bytes, bytearray, memoryview)) or len(raw) < 2:
+        return False
+    raw = bytes(raw[:2])
+    if raw[:1] != _BINARY_MAGIC:
+        return False
+    if dtype is None:
+        return raw[1:2] in _BINARY_CODES
+    return dtype in _BINARY_DTYPES and raw[1:2] == _BINARY_DTYPES[dtype][0]
+
+def decode_embedding(raw):
+    """
+    Decode a stored embedding into a float32 numpy array.
+    
+    Reads both the packed binary format and legacy JSON text (str or
+    bytes from a BLOB column), so rows can be migrated gradually.
+    """
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        if raw[:1] == _BINARY_MAGIC:
+            np_dtype = _BINARY_CODES.get(bytes(raw[1:2]))
+            if np_dtype is None:
+                raise ValueError("Unknown binary embedding dtype")
+            return np.frombuffer(raw, dtype=np_dtype, offset=2).astype(np.float32)
+        raw = bytes(raw).decode('utf-8')
+    return np.asarray(json.loads(raw), dtype=np.float32)
+
+def deserialize_embedding(embedding_raw):
+    """Convert a stored embedding (binary or JSON) back to a Python list."""
+    return decode_embedding(embedding_raw).tolist()
 
 def build_item_text(name, description, location, date=None):
     """
@@ -91,3 +345,18 @@ def compute_item_embedding(name, description, location, date=None):
     if not text:
         return None
     return compute_embedding(text)
+
+def compute_item_embeddings_batch(items, batch_size=None):
+    """
+    Compute unified embeddings for many items at once.
+    
+    Args:
+        items (list): Dicts with name, description, location and (optional) date keys
+        batch_size (int, optional): Texts per forward pass (defaults to EMBEDDING_BATCH_SIZE)
+    
+    Returns:
+        list: One embedding list (or None if the item has no text) per item
+    """
+    texts = [build_item_text(item.get('name'), item.get('description'),
+                             item.get('location'), item.get('date')) for item in items]
+    return compute_embeddings_batch(texts, batch_size=batch_size)
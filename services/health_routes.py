@@ -0,0 +1,23 @@
+from flask import Blueprint, jsonify
+
+from services.warmup import readiness, warm_up_in_background
+
+health_bp = Blueprint('health', __name__, url_prefix='/healthz')
+
+@health_bp.route('')
+def liveness():
+    """The process is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+@health_bp.route('/ready')
+def ready():
+    """
+    Readiness: 200 once the encoder is loaded (or the embedding server is
+    reachable) and warmed up, 503 before that.
+    
+    If nothing warmed this process up (e.g. flask run without the gunicorn
+    config), the first call starts the warm-up in the background.
+    """
+    warm_up_in_background()
+    status = readiness()
+    return jsonify(status), 200 if status['ready'] else 503
@@ -0,0 +1,260 @@
+#item_index.py
+import atexit
+import os
+import threading
+import time
+import zlib
+
+from db import get_db
+from services.ann_index import IVFIndex
+from services.embeddings import decode_embedding
+from services.similarity import build_embedding_matrix
+
+# ANN indexes over lost/found embeddings, persisted under ANN_INDEX_DIR
+ANN_INDEX_ENABLED = os.getenv('ANN_INDEX_ENABLED', '1') == '1'
+ANN_INDEX_DIR = os.getenv('ANN_INDEX_DIR', os.path.join('instance', 'ann_index'))
+ANN_INDEX_N_PROBE = int(os.getenv('ANN_INDEX_N_PROBE', '8'))
+# Minimum seconds between two index writes; pending changes are flushed at exit
+ANN_INDEX_SAVE_SECONDS = float(os.getenv('ANN_INDEX_SAVE_SECONDS', '30'))
+# How often a process checks whether another process saved a newer index file
+ANN_INDEX_RELOAD_SECONDS = float(os.getenv('ANN_INDEX_RELOAD_SECONDS', '10'))
+
+TABLES = {'lost': 'lost_items', 'found': 'found_items'}
+
+_indexes = {}
+_dirty = set()
+_last_saved = {}
+_file_stamp = {}       # kind -> mtime_ns of the index file as this process last loaded/saved it
+_last_checked = {}
+_lock = threading.RLock()
+
+
+def _index_path(kind):
+    return os.path.join(ANN_INDEX_DIR, f"{kind}_items.npz")
+
+
+def fetch_embedding_rows(kind, ids=None):
+    """Fetch (id, embedding) rows for one table, optionally limited to ids."""
+    table = TABLES[kind]
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        if ids is None:
+            cur.execute(f"SELECT id, embedding FROM {table} WHERE embedding IS NOT NULL")
+            return cur.fetchall() or []
+        rows = []
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cur.execute(f"""
+                SELECT id, embedding FROM {table}
+                WHERE embedding IS NOT NULL AND id IN ({placeholders})
+            """, chunk)
+            rows.extend(cur.fetchall() or [])
+        return rows
+    finally:
+        cur.close()
+        conn.close()
+
+
+def content_version(raw):
+    """CRC32 of a stored embedding value; the same number MySQL's CRC32(embedding) returns."""
+    if isinstance(raw, str):
+        raw = raw.encode('utf-8')
+    return zlib.crc32(bytes(raw))
+
+
+def fetch_embedding_versions(kind):
+    """{id: CRC32 of the stored embedding} for rows that have one (no vectors are transferred)."""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT id, CRC32(embedding) AS version FROM {TABLES[kind]} WHERE embedding IS NOT NULL")
+        return {row['id']: int(row['version']) for row in cur.fetchall() or []}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _insert_rows(index, kind, rows):
+    ids, matrix = build_embedding_matrix(rows, label=kind)
+    if not ids:
+        return index
+    if index is None:
+        index = IVFIndex(matrix.shape[1], n_probe=ANN_INDEX_N_PROBE)
+    if matrix.shape[1] != index.dim:
+        print(f"[ANN] ERROR: {kind} embeddings have dimension {matrix.shape[1]}, index has {index.dim}")
+        return index
+    versions = {row['id']: content_version(row['embedding']) for row in rows}
+    index.insert(ids, matrix, versions=[versions[item_id] for item_id in ids])
+    return index
+
+
+def _file_mtime(kind):
+    try:
+        return os.stat(_index_path(kind)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def rebuild_index(kind):
+    """Build the `kind` ('lost'/'found') index from every embedding in MySQL and save it."""
+    started = time.time()
+    index = _insert_rows(None, kind, fetch_embedding_rows(kind))
+    if index is not None:
+        index.train()
+    with _lock:
+        _indexes[kind] = index
+        _dirty.add(kind)
+        _last_checked[kind] = time.time()
+        save_index(kind, force=True)
+    print(f"[ANN] Rebuilt {kind} index: {len(index) if index else 0} vectors "
+          f"in {time.time() - started:.2f}s")
+    return index
+
+
+def _reconcile(index, kind):
+    """
+    Bring a loaded index up to date with MySQL. Only (id, CRC32) pairs are
+    read; embeddings are fetched for ids that are missing or whose stored
+    embedding changed (e.g. re-embedded after an edit) since the file was saved.
+    """
+    db_versions = fetch_embedding_versions(kind)
+    index_ids = set(index.ids())
+    stale = index_ids - db_versions.keys()
+    missing = db_versions.keys() - index_ids
+    changed = {item_id for item_id in index_ids & db_versions.keys()
+               if index.versions.get(item_id) != db_versions[item_id]}
+    if stale:
+        index.delete(stale)
+    if missing or changed:
+        index = _insert_rows(index, kind, fetch_embedding_rows(kind, missing | changed))
+    if missing or stale or changed:
+        _dirty.add(kind)
+        print(f"[ANN] Reconciled {kind} index: +{len(missing)} / -{len(stale)} / ~{len(changed)}")
+    return index
+
+
+def _load(kind):
+    """Load the index file and reconcile it; None if there is no usable file."""
+    path = _index_path(kind)
+    stamp = _file_mtime(kind)
+    if stamp is None:
+        return None
+    try:
+        index = _reconcile(IVFIndex.load(path), kind)
+    except Exception as e:
+        print(f"[ANN] ERROR loading {path}: {e}; rebuilding")
+        return None
+    _indexes[kind] = index
+    _file_stamp[kind] = stamp
+    _last_checked[kind] = time.time()
+    return index
+
+
+def get_index(kind):
+    """
+    Return the in-process ANN index for 'lost' or 'found' items.
+
+    The index is loaded from disk on first use and reconciled against
+    MySQL; only embeddings missing from the file or changed since it was
+    written are fetched. It is rebuilt from scratch if no file exists yet.
+
+    Every process (web workers, job worker, CLI) keeps its own copy and
+    saves to the same file. At most every ANN_INDEX_RELOAD_SECONDS it
+    checks whether another process saved the file since, and if so reloads
+    and reconciles it, so changes made elsewhere show up here too.
+
+    Returns:
+        IVFIndex or None: None if the table has no embeddings yet
+    """
+    with _lock:
+        if kind in _indexes:
+            if time.time() - _last_checked.get(kind, 0) < ANN_INDEX_RELOAD_SECONDS:
+                return _indexes[kind]
+            _last_checked[kind] = time.time()
+            stamp = _file_mtime(kind)
+            if stamp is None or stamp == _file_stamp.get(kind):
+                return _indexes[kind]
+            # Unsaved local changes are in MySQL too, so reconciling restores them
+            print(f"[ANN] {kind} index file changed in another process; reloading")
+            index = _load(kind)
+            return index if index is not None else _indexes[kind]
+        index = _load(kind)
+        if index is not None:
+            return index
+        return rebuild_index(kind)
+
+
+def save_index(kind, force=False):
+    """Persist the index if it changed (throttled unless force=True)."""
+    with _lock:
+        index = _indexes.get(kind)
+        if index is None or kind not in _dirty:
+            return
+        if not force and time.time() - _last_saved.get(kind, 0) < ANN_INDEX_SAVE_SECONDS:
+            return
+        try:
+            index.save(_index_path(kind))
+            _dirty.discard(kind)
+            _last_saved[kind] = time.time()
+            _file_stamp[kind] = _file_mtime(kind)
+        except OSError as e:
+            print(f"[ANN] ERROR saving {kind} index: {e}")
+
+
+@atexit.register
+def save_all_indexes():
+    for kind in list(_indexes):
+        save_index(kind, force=True)
+
+
+def index_item(kind, item_id, embedding):
+    """
+    Insert or replace one item's vector. Pass the stored embedding
+    (bytes/JSON) so its content version is recorded; a plain vector gets
+    none and is re-fetched on the next reconcile.
+    """
+    if not ANN_INDEX_ENABLED:
+        return
+    version = None
+    if isinstance(embedding, (bytes, bytearray, memoryview, str)):
+        version = content_version(embedding)
+        embedding = decode_embedding(embedding)
+    with _lock:
+        index = get_index(kind)
+        if index is None:
+            index = IVFIndex(len(embedding), n_probe=ANN_INDEX_N_PROBE)
+        if len(embedding) != index.dim:
+            print(f"[ANN] ERROR: {kind} item {item_id} has dimension {len(embedding)}, index has {index.dim}")
+            return
+        index.insert([item_id], [embedding], versions=None if version is None else [version])
+        _indexes[kind] = index
+        _dirty.add(kind)
+        save_index(kind)
+
+
+def remove_item(kind, item_id):
+    """Remove one item from the index (e.g. after it is deleted)."""
+    if not ANN_INDEX_ENABLED:
+        return
+    with _lock:
+        index = get_index(kind)
+        if index is not None and index.delete([item_id]):
+            _dirty.add(kind)
+            save_index(kind)
+
+
+def search_index(kind, vector, threshold=0.75, k=None):
+    """
+    Query the 'lost' or 'found' index.
+
+    Returns:
+        list: (id, score) tuples above threshold, best first
+    """
+    with _lock:
+        index = get_index(kind)
+        if index is None or len(vector) != index.dim:
+            return []
+        return index.search(vector, k=k, threshold=threshold)
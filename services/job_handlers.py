@@ -0,0 +1,92 @@
+#job_handlers.py
+from db import get_db
+from services.jobs import enqueue, job_handler
+from services.notification_outbox import dispatch_outbox
+
+ITEM_QUERIES = {
+    'lost': "SELECT id, name, description, last_seen AS location, last_seen_at AS date FROM lost_items WHERE id = %s",
+    'found': "SELECT id, name, description, where_found AS location, found_at AS date FROM found_items WHERE id = %s",
+}
+
+
+def enqueue_item_embedding(item_type, item_id):
+    """Queue (re)embedding + matching for one lost/found item; duplicates are merged."""
+    return enqueue('embed_item', {'item_type': item_type, 'item_id': item_id},
+                   dedupe_key=f"embed:{item_type}:{item_id}")
+
+
+def enqueue_item_removal(item_type, item_id):
+    """Queue removal of a deleted item from the ANN index and embedding store."""
+    return enqueue('forget_item', {'item_type': item_type, 'item_id': item_id},
+                   dedupe_key=f"forget:{item_type}:{item_id}")
+
+
+def enqueue_matching_run(threshold=0.75, top_k=None, found_top_k=None):
+    """Queue a full matching pipeline run (at most one queued at a time)."""
+    payload = {'threshold': threshold}
+    if top_k is not None:
+        payload['top_k'] = top_k
+    if found_top_k is not None:
+        payload['found_top_k'] = found_top_k
+    return enqueue('run_matching', payload, dedupe_key='run_matching')
+
+
+@job_handler('embed_item')
+def embed_item(payload, progress):
+    """Compute and save an item's embedding from its current row, then match it."""
+    # Imported here so the web app (which only enqueues) never loads the ML stack
+    from services.embeddings import compute_item_embedding, serialize_embedding
+    from services.matching import match_found_item, match_lost_item
+
+    item_type = payload['item_type']
+    item_id = payload['item_id']
+    table = 'lost_items' if item_type == 'lost' else 'found_items'
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(ITEM_QUERIES[item_type], (item_id,))
+        item = cur.fetchone()
+        if not item:
+            return {'skipped': 'item deleted'}
+
+        progress('computing embedding')
+        emb = compute_item_embedding(item['name'], item['description'], item['location'], item['date'])
+        if not emb:
+            return {'skipped': 'no text to embed'}
+        cur.execute(f"UPDATE {table} SET embedding=%s WHERE id=%s", (serialize_embedding(emb), item_id))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+    progress('matching')
+    if item_type == 'lost':
+        matches = match_lost_item(item_id, threshold=0.75)
+    else:
+        matches = match_found_item(item_id, threshold=0.75)
+    return {'matches': len(matches)}
+
+
+@job_handler('forget_item')
+def forget_item_job(payload, progress):
+    from services.matching import forget_item
+
+    forget_item(payload['item_type'], payload['item_id'])
+    return {'removed': True}
+
+
+@job_handler('run_matching')
+def run_matching(payload, progress):
+    from commands.run_matching import run_matching_job
+
+    progress('scoring all unmatched lost items')
+    # Keys left out of the payload fall back to MATCH_TOP_K / MATCH_FOUND_TOP_K
+    options = {key: payload[key] or None for key in ('top_k', 'found_top_k') if key in payload}
+    return run_matching_job(threshold=payload.get('threshold', 0.75), **options)
+
+
+@job_handler('dispatch_notifications')
+def dispatch_notifications(payload, progress):
+    """Move queued notifications from the outbox into `notifications`."""
+    return {'delivered': dispatch_outbox()}
@@ -0,0 +1,287 @@
+#jobs.py
+import json
+import os
+import socket
+import traceback
+
+from db import after_commit, get_db
+
+# Run jobs in the web process right after enqueueing (dev setups without a worker)
+JOBS_INLINE = os.getenv('JOBS_INLINE', '0') == '1'
+# A running job whose worker has been silent this long is handed out again
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '600'))
+
+_table_ready = False
+
+# kind -> callable(payload, progress) registered by services/job_handlers.py
+HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of `kind`."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+# active_key holds dedupe_key only while the job is queued, so the
+# unique index merges duplicate queued jobs but still allows one
+# new queued job next to a running one.
+JOBS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    kind VARCHAR(64) NOT NULL,
+    payload TEXT,
+    dedupe_key VARCHAR(191) NULL,
+    active_key VARCHAR(191) NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    progress VARCHAR(255) NULL,
+    result TEXT NULL,
+    last_error TEXT NULL,
+    locked_by VARCHAR(128) NULL,
+    run_after DATETIME NOT NULL,
+    created_at DATETIME NOT NULL,
+    started_at DATETIME NULL,
+    heartbeat_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    UNIQUE KEY uq_jobs_active_key (active_key),
+    KEY idx_jobs_status_run_after (status, run_after),
+    KEY idx_jobs_dedupe_key (dedupe_key, id)
+)
+"""
+
+
+def ensure_jobs_table():
+    """Create the jobs table if it does not exist yet (also migration 2 in schema/migrations.py)."""
+    global _table_ready
+    if _table_ready:
+        return
+    # DDL commits implicitly, so keep it off a request's shared transaction
+    conn = get_db(scoped=False)
+    cur = conn.cursor()
+    try:
+        cur.execute(JOBS_TABLE_SQL)
+        conn.commit()
+        _table_ready = True
+    finally:
+        cur.close()
+        conn.close()
+
+
+def enqueue(kind, payload=None, dedupe_key=None, max_attempts=5):
+    """
+    Add a job to the queue.
+
+    If a queued (not yet running) job with the same dedupe_key exists, no
+    new row is added and that job's id is returned instead.
+
+    Args:
+        kind (str): Handler name, e.g. 'embed_item'
+        payload (dict, optional): JSON-serializable job arguments
+        dedupe_key (str, optional): Key identifying duplicate work
+        max_attempts (int): Attempts before the job is marked failed
+
+    Returns:
+        int: Job id
+    """
+    ensure_jobs_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            INSERT INTO jobs (kind, payload, dedupe_key, active_key, max_attempts, run_after, created_at)
+            VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
+            ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id), payload = VALUES(payload)
+        """, (kind, json.dumps(payload or {}), dedupe_key, dedupe_key, max_attempts))
+        job_id = cur.lastrowid
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    print(f"[JOBS] Enqueued {kind} job {job_id} ({dedupe_key or 'no dedupe key'})")
+    if JOBS_INLINE:
+        # Inside a request the job row (and the item it refers to) is only
+        # visible to other connections once the request commits
+        after_commit(_run_inline, job_id)
+    return job_id
+
+
+def _run_inline(job_id):
+    run_job(claim_job(job_id=job_id))
+
+
+def claim_job(worker_id=None, job_id=None):
+    """
+    Lock the next runnable job (or a specific queued job) for this worker.
+
+    Jobs left 'running' by a worker that died are reclaimed once their
+    heartbeat is older than JOB_LEASE_SECONDS.
+
+    Returns:
+        dict or None: The claimed job row
+    """
+    ensure_jobs_table()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        if job_id is not None:
+            cur.execute("""
+                SELECT * FROM jobs WHERE id = %s AND status = 'queued' FOR UPDATE
+            """, (job_id,))
+        else:
+            cur.execute("""
+                SELECT * FROM jobs
+                WHERE (status = 'queued' AND run_after <= NOW())
+                   OR (status = 'running' AND heartbeat_at < NOW() - INTERVAL %s SECOND)
+                ORDER BY run_after, id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            """, (JOB_LEASE_SECONDS,))
+        job = cur.fetchone()
+        if not job:
+            conn.commit()
+            return None
+
+        cur.execute("""
+            UPDATE jobs
+            SET status = 'running', active_key = NULL, attempts = attempts + 1,
+                locked_by = %s, started_at = NOW(), heartbeat_at = NOW()
+            WHERE id = %s
+        """, (worker_id, job['id']))
+        conn.commit()
+        job['attempts'] += 1
+        job['status'] = 'running'
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _update_job(job_id, sql, params):
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"UPDATE jobs SET {sql} WHERE id = %s", (*params, job_id))
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+
+
+def set_progress(job_id, message):
+    """Record a short progress message and refresh the job's lease."""
+    _update_job(job_id, "progress = %s, heartbeat_at = NOW()", (str(message)[:255],))
+
+
+def complete_job(job_id, result=None):
+    _update_job(job_id, "status = 'done', progress = 'done', result = %s, finished_at = NOW()",
+                (json.dumps(result),))
+
+
+def fail_job(job, error):
+    """Requeue the job with exponential backoff, or mark it failed after max_attempts."""
+    if job['attempts'] >= job['max_attempts']:
+        _update_job(job['id'], "status = 'failed', last_error = %s, finished_at = NOW()", (error,))
+        print(f"[JOBS] Job {job['id']} failed permanently after {job['attempts']} attempts")
+        return
+    delay = min(30 * 2 ** (job['attempts'] - 1), 3600)
+    _update_job(job['id'], """
+        status = 'queued', last_error = %s, locked_by = NULL,
+        run_after = NOW() + INTERVAL %s SECOND
+    """, (error, delay))
+    print(f"[JOBS] Job {job['id']} will retry in {delay}s")
+
+
+def run_job(job):
+    """Execute a claimed job with its registered handler."""
+    if not job:
+        return False
+    if not HANDLERS:
+        import services.job_handlers  # noqa: F401  (registers the handlers)
+    handler = HANDLERS.get(job['kind'])
+    if handler is None:
+        fail_job(dict(job, attempts=job['max_attempts']), f"No handler for job kind {job['kind']!r}")
+        return False
+
+    print(f"[JOBS] Running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+    try:
+        result = handler(json.loads(job['payload'] or '{}'), lambda msg: set_progress(job['id'], msg))
+        complete_job(job['id'], result)
+        return True
+    except Exception as e:
+        print(f"[JOBS] ERROR in job {job['id']}: {e}")
+        fail_job(job, f"{e}\n{traceback.format_exc()}"[:8000])
+        return False
+
+
+def _public(job):
+    if not job:
+        return None
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'result': json.loads(job['result']) if job.get('result') else None,
+        'last_error': (job.get('last_error') or '').splitlines()[0] if job.get('last_error') else None,
+        'created_at': job['created_at'].isoformat() if job.get('created_at') else None,
+        'started_at': job['started_at'].isoformat() if job.get('started_at') else None,
+        'finished_at': job['finished_at'].isoformat() if job.get('finished_at') else None,
+    }
+
+
+def get_job(job_id):
+    """Return a job's status as a JSON-friendly dict (or None)."""
+    ensure_jobs_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT * FROM jobs WHERE id = %s", (job_id,))
+        return _public(cur.fetchone())
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_latest_job(dedupe_key):
+    """Return the most recent job for a dedupe key (e.g. one item's embedding)."""
+    ensure_jobs_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT * FROM jobs WHERE dedupe_key = %s ORDER BY id DESC LIMIT 1
+        """, (dedupe_key,))
+        return _public(cur.fetchone())
+    finally:
+        cur.close()
+        conn.close()
+
+
+def list_jobs(status=None, limit=50):
+    """Return recent jobs, newest first."""
+    ensure_jobs_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        if status:
+            cur.execute("SELECT * FROM jobs WHERE status = %s ORDER BY id DESC LIMIT %s", (status, limit))
+        else:
+            cur.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT %s", (limit,))
+        return [_public(job) for job in cur.fetchall() or []]
+    finally:
+        cur.close()
+        conn.close()
@@ -0,0 +1,133 @@
+#local_store.py
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+# Small key-value store with per-key TTL, shared by every worker on this host
+LOCAL_STORE_PATH = os.getenv('LOCAL_STORE_PATH', os.path.join('instance', 'local_store.sqlite3'))
+
+# Purge expired keys every this many writes
+_PURGE_EVERY = 500
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+
+def _decode(obj):
+    if '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    if '__date__' in obj:
+        return date.fromisoformat(obj['__date__'])
+    return obj
+
+
+class LocalStore:
+    """
+    JSON values in a sqlite file (WAL mode), so gunicorn workers, the job
+    worker and the embedding server see each other's writes without a
+    network cache. Values may contain datetimes. Errors are logged and
+    behave like a miss: callers must treat the store as a cache.
+    """
+
+    def __init__(self, path=LOCAL_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def connection(self):
+        """This thread's sqlite connection to the store file (autocommit mode)."""
+        conn = getattr(self._local, 'conn', None)
+        # A connection must not be used across fork()
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS store (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL
+                )
+            """)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        try:
+            row = self.connection().execute("SELECT value, expires_at FROM store WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR reading {key}: {e}")
+            return default
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        return json.loads(row[0], object_hook=_decode)
+
+    def set(self, key, value, ttl=None):
+        """Store a JSON-serializable value, expiring after ttl seconds (never if None)."""
+        expires_at = time.time() + ttl if ttl else None
+        try:
+            conn = self.connection()
+            conn.execute("INSERT OR REPLACE INTO store (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, default=_encode), expires_at))
+            self._writes += 1
+            if self._writes >= _PURGE_EVERY:
+                self._writes = 0
+                conn.execute("DELETE FROM store WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR writing {key}: {e}")
+
+    def incr(self, key, initial=0):
+        """Atomically add 1 to an integer value; a missing (or expired) key is set to initial."""
+        try:
+            self.connection().execute("""
+                INSERT INTO store (key, value, expires_at) VALUES (?, ?, NULL)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = CASE WHEN expires_at IS NOT NULL AND expires_at <= ?
+                                 THEN excluded.value ELSE CAST(value AS INTEGER) + 1 END,
+                    expires_at = NULL
+            """, (key, json.dumps(int(initial)), time.time()))
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR incrementing {key}: {e}")
+
+    def add(self, key, value, ttl=None):
+        """Store value unless the key already exists."""
+        expires_at = time.time() + ttl if ttl else None
+        try:
+            self.connection().execute("INSERT OR IGNORE INTO store (key, value, expires_at) VALUES (?, ?, ?)",
+                                      (key, json.dumps(value, default=_encode), expires_at))
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR writing {key}: {e}")
+
+    def delete(self, *keys):
+        try:
+            self.connection().executemany("DELETE FROM store WHERE key = ?", [(key,) for key in keys])
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR deleting {keys}: {e}")
+
+    def delete_prefix(self, prefix):
+        """Delete every key starting with prefix (a primary-key range scan)."""
+        try:
+            self.connection().execute("DELETE FROM store WHERE key >= ? AND key < ?", (prefix, prefix + '\uffff'))
+        except sqlite3.Error as e:
+            print(f"[LOCAL STORE] ERROR deleting {prefix}*: {e}")
+
+
+_store = None
+
+
+def get_store():
+    """Return the process-wide LocalStore."""
+    global _store
+    if _store is None:
+        _store = LocalStore()
+    return _store
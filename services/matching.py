@@ -1,9 +1,33 @@
 #matching.py
-import json
+import os
+from datetime import date, datetime, time
+
 import numpy as np
-from db import get_db
-from services.embeddings import deserialize_embedding
-from sklearn.metrics.pairwise import cosine_similarity
+from db import after_commit, get_db
+from services.embeddings import decode_embedding
+from services.embedding_store import EMBEDDING_STORE_ENABLED, get_store
+from services.item_index import (
+    ANN_INDEX_ENABLED, fetch_embedding_rows, index_item, remove_item, search_index
+)
+from services.pubsub import publish
+from services.user_versions import bump
+from services.similarity import build_embedding_matrix, keep_top_k, score_pairs
+
+# Pairs written per multi-row INSERT in save_matches
+SAVE_BATCH_SIZE = int(os.getenv('MATCH_SAVE_BATCH_SIZE', '500'))
+# Best pairs kept per lost / per found item (0 = keep every pair above the threshold)
+MATCH_TOP_K = int(os.getenv('MATCH_TOP_K', '0')) or None
+MATCH_FOUND_TOP_K = int(os.getenv('MATCH_FOUND_TOP_K', '0')) or None
+# Blocking: only score pairs in the same category whose found_at is no
+# earlier than last_seen_at minus the slack
+MATCH_BLOCKING_ENABLED = os.getenv('MATCH_BLOCKING_ENABLED', '1') == '1'
+MATCH_DATE_SLACK_DAYS = float(os.getenv('MATCH_DATE_SLACK_DAYS', '7'))
+# Categories that say nothing about the item; they are compared with every category
+MATCH_WILDCARD_CATEGORIES = {
+    c.strip().lower() for c in os.getenv('MATCH_WILDCARD_CATEGORIES', 'Others').split(',') if c.strip()
+}
+# Lost items scored together against one date-window slice of found items
+BLOCK_CHUNK_ROWS = 256
 
 def get_unmatched_lost_items():
     """Get all lost items that haven't been matched yet"""
@@ -11,7 +35,7 @@ def get_unmatched_lost_items():
     cur = conn.cursor()
     try:
         cur.execute("""
-            SELECT id, name, description, last_seen, last_seen_at, embedding
+            SELECT id, name, category, description, last_seen, last_seen_at, embedding
             FROM lost_items
             WHERE embedding IS NOT NULL
             AND id NOT IN (
@@ -30,7 +54,7 @@ def get_all_found_items():
     cur = conn.cursor()
     try:
         cur.execute("""
-            SELECT id, name, description, where_found, found_at, embedding
+            SELECT id, name, category, description, where_found, found_at, embedding
             FROM found_items
             WHERE embedding IS NOT NULL
         """)
@@ -40,20 +64,270 @@ def get_all_found_items():
         conn.close()
     return items if items else []
 
+def get_lost_item(item_id):
+    """Get a single lost item with its embedding"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, name, category, description, last_seen, last_seen_at, embedding
+            FROM lost_items
+            WHERE id = %s AND embedding IS NOT NULL
+        """, (item_id,))
+        return cur.fetchone()
+    finally:
+        cur.close()
+        conn.close()
+
+def get_found_item(item_id):
+    """Get a single found item with its embedding"""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, name, category, description, where_found, found_at, embedding
+            FROM found_items
+            WHERE id = %s AND embedding IS NOT NULL
+        """, (item_id,))
+        return cur.fetchone()
+    finally:
+        cur.close()
+        conn.close()
+
+BLOCKING_KEY_QUERIES = {
+    'lost': "SELECT id, category, last_seen_at AS item_date FROM lost_items WHERE embedding IS NOT NULL",
+    'found': "SELECT id, category, found_at AS item_date FROM found_items WHERE embedding IS NOT NULL",
+}
+
+def _category_key(category):
+    """Normalized category, or None for a missing/wildcard category."""
+    key = (category or '').strip().lower()
+    return None if not key or key in MATCH_WILDCARD_CATEGORIES else key
+
+def _day_number(value):
+    """Days since the epoch as a float, or NaN if the date is missing."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return float('nan')
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds() / 86400
+    if isinstance(value, date):
+        return (datetime.combine(value, time()) - datetime(1970, 1, 1)).total_seconds() / 86400
+    return float('nan')
+
+def blocking_keys_from_rows(rows, date_field):
+    """Map item id -> (category key, day number) for rows that carry both fields."""
+    return {row['id']: (_category_key(row.get('category')), _day_number(row.get(date_field)))
+            for row in rows}
+
+def get_blocking_keys(kind, ids=None, unmatched_only=False):
+    """
+    Fetch the blocking fields (no embeddings) of embedded lost/found items.
+    
+    Args:
+        kind (str): 'lost' or 'found'
+        ids (iterable, optional): Limit to these ids
+        unmatched_only (bool): For 'lost', skip items that already have matches
+    
+    Returns:
+        dict: item id -> (category key, day number)
+    """
+    sql = BLOCKING_KEY_QUERIES[kind]
+    if unmatched_only:
+        sql += " AND id NOT IN (SELECT DISTINCT lost_item_id FROM matches)"
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        if ids is None:
+            cur.execute(sql)
+            return blocking_keys_from_rows(cur.fetchall() or [], 'item_date')
+        rows = []
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            cur.execute(f"{sql} AND id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            rows.extend(cur.fetchall() or [])
+        return blocking_keys_from_rows(rows, 'item_date')
+    finally:
+        cur.close()
+        conn.close()
+
+def pair_allowed(lost_key, found_key, slack_days=MATCH_DATE_SLACK_DAYS):
+    """Blocking rule for one pair of (category key, day number) keys."""
+    if lost_key[0] and found_key[0] and lost_key[0] != found_key[0]:
+        return False
+    # NaN compares False, so an undated item is never pruned by date
+    return not found_key[1] < lost_key[1] - slack_days
+
+def load_item_vectors(kind, ids, prune=False):
+    """
+    Get normalized vectors for ids from the shared memory-mapped store.
+    
+    Ids missing from the store are fetched from MySQL once and appended.
+    With prune=True, `ids` is the full set for the table and store rows for
+    other ids are tombstoned. When the store holds exactly `ids`, the
+    returned matrix is the memory map itself (no copy).
+    
+    Returns:
+        tuple: (ids list, float32 matrix)
+    """
+    store = get_store(kind)
+    wanted = set(ids)
+    live = set(store.live_ids())
+    
+    missing = wanted - live
+    if missing:
+        new_ids, new_matrix = build_embedding_matrix(fetch_embedding_rows(kind, missing), label=kind)
+        if new_ids:
+            store.put(new_ids, new_matrix)
+            print(f"[STORE] Added {len(new_ids)} {kind} vectors from MySQL")
+    if prune and live - wanted:
+        store.delete(live - wanted)
+    
+    if prune or wanted == set(store.live_ids()):
+        return store.get_matrix()
+    return store.get_matrix(ids)
+
+def _sync_item(kind, item_id, stored, vector):
+    """Push one item's new vector (and its stored form, for versioning) to the ANN index and the shared store."""
+    index_item(kind, item_id, stored)
+    if EMBEDDING_STORE_ENABLED:
+        get_store(kind).put([item_id], [vector])
+
+def forget_item(kind, item_id):
+    """Drop a deleted item from the ANN index and the shared store."""
+    remove_item(kind, item_id)
+    if EMBEDDING_STORE_ENABLED:
+        get_store(kind).delete([item_id])
+
+    # Owners of the other side of the item's matches just lost one
+    own_col, other_col, other_table = (
+        ('lost_item_id', 'found_item_id', 'found_items') if kind == 'lost'
+        else ('found_item_id', 'lost_item_id', 'lost_items')
+    )
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT DISTINCT t.user_id FROM matches m
+            JOIN {other_table} t ON t.id = m.{other_col}
+            WHERE m.{own_col} = %s
+        """, (item_id,))
+        owners = {row['user_id'] for row in cur.fetchall() or []}
+    finally:
+        cur.close()
+        conn.close()
+    if owners:
+        _matches_changed(owners)
+
 def compute_cosine_similarity(emb1, emb2):
     """Compute cosine similarity between two embeddings"""
     if not emb1 or not emb2:
         return 0.0
     
     try:
-        emb1_array = np.array(emb1).reshape(1, -1)
-        emb2_array = np.array(emb2).reshape(1, -1)
-        similarity = cosine_similarity(emb1_array, emb2_array)[0][0]
-        return float(similarity)
+        emb1_array = np.asarray(emb1, dtype=np.float64).ravel()
+        emb2_array = np.asarray(emb2, dtype=np.float64).ravel()
+        norms = np.linalg.norm(emb1_array) * np.linalg.norm(emb2_array)
+        if norms == 0:
+            return 0.0
+        return float(emb1_array @ emb2_array / norms)
     except Exception:
         return 0.0
 
-def generate_matches(threshold=0.75):
+def score_blocked_pairs(lost_ids, lost_matrix, lost_keys, found_ids, found_matrix, found_keys,
+                        threshold=0.75, top_k=None, found_top_k=None, slack_days=MATCH_DATE_SLACK_DAYS):
+    """
+    Score only the lost x found pairs that pass the blocking rule.
+    
+    Lost items are grouped by category; each group is scored against the
+    found items of that category plus the wildcard ones ('Others' or no
+    category). Within a group both sides are sorted by date, so a chunk of
+    lost items only multiplies against the found items dated on or after
+    its earliest last_seen_at minus slack_days. The exact per-pair date rule
+    is applied as a mask on top (see pair_allowed).
+    
+    Args:
+        lost_keys (list): (category key, day number) per lost row
+        found_keys (list): (category key, day number) per found row
+        (other arguments as in services.similarity.score_pairs)
+    
+    Returns:
+        list: Match dictionaries with lost_item_id, found_item_id, and score
+    """
+    lost_days = np.array([key[1] for key in lost_keys], dtype=np.float64)
+    found_days = np.array([key[1] for key in found_keys], dtype=np.float64)
+    
+    found_groups = {}
+    for col, (category, _) in enumerate(found_keys):
+        found_groups.setdefault(category, []).append(col)
+    wildcard_found = found_groups.pop(None, [])
+    lost_groups = {}
+    for row, (category, _) in enumerate(lost_keys):
+        lost_groups.setdefault(category, []).append(row)
+    
+    allowed = [0]
+    scored = 0
+    matches = []
+    for category, rows in lost_groups.items():
+        cols = np.arange(len(found_ids)) if category is None else np.array(
+            found_groups.get(category, []) + wildcard_found, dtype=np.int64)
+        if cols.size == 0:
+            continue
+        # Dated found items in date order, undated ones last: every chunk's
+        # candidates are then one contiguous suffix of group_found
+        cols = cols[np.argsort(found_days[cols], kind='stable')]
+        group_days = found_days[cols]
+        dated = int(np.count_nonzero(~np.isnan(group_days)))
+        group_found = found_matrix[cols]
+        group_found_ids = [found_ids[c] for c in cols.tolist()]
+        
+        rows = np.array(rows, dtype=np.int64)
+        rows = rows[np.argsort(lost_days[rows], kind='stable')]
+        lost_dated = int(np.count_nonzero(~np.isnan(lost_days[rows])))
+        # Undated lost items get their own chunks, which see every candidate
+        chunks = [rows[start:min(start + BLOCK_CHUNK_ROWS, lost_dated)]
+                  for start in range(0, lost_dated, BLOCK_CHUNK_ROWS)]
+        chunks += [rows[start:start + BLOCK_CHUNK_ROWS]
+                   for start in range(lost_dated, rows.size, BLOCK_CHUNK_ROWS)]
+        for chunk in chunks:
+            earliest = lost_days[chunk[0]]
+            first = 0 if np.isnan(earliest) else int(
+                np.searchsorted(group_days[:dated], earliest - slack_days, side='left'))
+            if first >= cols.size:
+                continue
+            chunk_days = lost_days[chunk][:, None]
+            cand_days = group_days[first:][None, :]
+            scored += chunk.size * (cols.size - first)
+            
+            def date_mask(r0, c0, block, chunk_days=chunk_days, cand_days=cand_days):
+                lost_block = chunk_days[r0:r0 + block.shape[0]]
+                found_block = cand_days[:, c0:c0 + block.shape[1]]
+                mask = ~(found_block < lost_block - slack_days)
+                allowed[0] += int(np.count_nonzero(mask))
+                return mask
+            
+            matches.extend(score_pairs(
+                [lost_ids[r] for r in chunk.tolist()], lost_matrix[chunk],
+                group_found_ids[first:], group_found[first:],
+                threshold=threshold, top_k=top_k, found_top_k=found_top_k, pair_mask=date_mask,
+            ))
+    
+    # A found item can appear in several groups, so cap it over all of them
+    if found_top_k and matches:
+        kept = keep_top_k(np.array([m['found_item_id'] for m in matches]),
+                          np.array([m['score'] for m in matches]), found_top_k)
+        matches = [matches[i] for i in kept.tolist()]
+    
+    total = len(lost_ids) * len(found_ids)
+    print(f"MATCHING: blocking pruned {total - allowed[0]} of {total} pairs "
+          f"({(total - allowed[0]) / max(total, 1):.1%}); {scored} scored, "
+          f"{allowed[0]} within category/date window")
+    return matches
+
+def generate_matches(threshold=0.75, top_k=MATCH_TOP_K, found_top_k=MATCH_FOUND_TOP_K):
     """
     Generate matches between lost and found items using unified embeddings.
     
@@ -61,97 +335,141 @@ def generate_matches(threshold=0.75):
     in one unified vector space, allowing ML to capture semantic relationships
     across all dimensions without hand-tuned field weights.
     
+    Each side is decoded once into a normalized matrix and all pairs are
+    scored with blocked matrix multiplies (see services/similarity.py).
+    With EMBEDDING_STORE_ENABLED only ids are read from MySQL and the
+    vectors come from the shared memory-mapped store.
+    
+    With top_k set, a generic item ("black wallet") keeps only its k best
+    pairs instead of every pair above the threshold.
+    
     Args:
         threshold (float): Similarity score threshold (0.0 to 1.0)
+        top_k (int, optional): Best matches kept per lost item
+        found_top_k (int, optional): Best matches kept per found item
     
     Returns:
         list: List of match dictionaries with lost_item_id, found_item_id, and score
     """
-    lost_items = get_unmatched_lost_items()
-    found_items = get_all_found_items()
+    if EMBEDDING_STORE_ENABLED:
+        lost_keys = get_blocking_keys('lost', unmatched_only=True)
+        found_keys = get_blocking_keys('found')
+        lost_ids, lost_matrix = load_item_vectors('lost', lost_keys)
+        found_ids, found_matrix = load_item_vectors('found', found_keys, prune=True)
+    else:
+        lost_items = get_unmatched_lost_items()
+        found_items = get_all_found_items()
+        lost_keys = blocking_keys_from_rows(lost_items, 'last_seen_at')
+        found_keys = blocking_keys_from_rows(found_items, 'found_at')
+        lost_ids, lost_matrix = build_embedding_matrix(lost_items, label='lost')
+        found_ids, found_matrix = build_embedding_matrix(found_items, label='found')
     
-    matches = []
+    if not lost_ids or not found_ids:
+        return []
     
-    for lost in lost_items:
-        # Handle both dict and tuple returns
-        lost_embedding = lost.get('embedding') if isinstance(lost, dict) else (lost[5] if lost and len(lost) > 5 else None)
-        if not lost_embedding:
-            continue
-        
-        try:
-            lost_emb = deserialize_embedding(lost_embedding)
-        except (json.JSONDecodeError, TypeError):
-            lost_id = lost.get('id') if isinstance(lost, dict) else (lost[0] if lost and len(lost) > 0 else '?')
-            print(f"ERROR: Could not deserialize embedding for lost item {lost_id}")
-            continue
-        
-        for found in found_items:
-            found_embedding = found.get('embedding') if isinstance(found, dict) else (found[5] if found and len(found) > 5 else None)
-            if not found_embedding:
-                continue
-            
-            try:
-                found_emb = deserialize_embedding(found_embedding)
-            except (json.JSONDecodeError, TypeError):
-                found_id = found.get('id') if isinstance(found, dict) else (found[0] if found and len(found) > 0 else '?')
-                print(f"ERROR: Could not deserialize embedding for found item {found_id}")
-                continue
-            
-            # Compare unified embeddings
-            similarity = compute_cosine_similarity(lost_emb, found_emb)
-            
-            if similarity >= threshold:
-                lost_id = lost.get('id') if isinstance(lost, dict) else (lost[0] if lost and len(lost) > 0 else None)
-                found_id = found.get('id') if isinstance(found, dict) else (found[0] if found and len(found) > 0 else None)
-                if lost_id and found_id:
-                    matches.append({
-                        'lost_item_id': lost_id,
-                        'found_item_id': found_id,
-                        'score': round(similarity * 100, 2)
-                    })
-                    print(f"MATCH FOUND: Lost {lost_id} ↔ Found {found_id} (Score: {similarity:.2%})")
+    if lost_matrix.shape[1] != found_matrix.shape[1]:
+        print(f"ERROR: Lost/found embedding dimensions differ "
+              f"({lost_matrix.shape[1]} vs {found_matrix.shape[1]})")
+        return []
+    
+    if MATCH_BLOCKING_ENABLED:
+        lost_keys = [lost_keys.get(item_id, (None, float('nan'))) for item_id in lost_ids]
+        found_keys = [found_keys.get(item_id, (None, float('nan'))) for item_id in found_ids]
+        matches = score_blocked_pairs(lost_ids, lost_matrix, lost_keys, found_ids, found_matrix, found_keys,
+                                      threshold=threshold, top_k=top_k, found_top_k=found_top_k)
+    else:
+        matches = score_pairs(lost_ids, lost_matrix, found_ids, found_matrix, threshold=threshold,
+                              top_k=top_k, found_top_k=found_top_k)
+    print(f"MATCHING: scored {len(lost_ids)} lost x {len(found_ids)} found items, "
+          f"{len(matches)} pairs >= {threshold:.2f} (top_k={top_k}, found_top_k={found_top_k})")
     
     return matches
 
-def save_matches(matches):
-    """Save matches to the database"""
+def _dedupe_pairs(matches):
+    """Collapse repeated (lost, found) pairs, keeping the last score given."""
+    pairs = {}
+    for match in matches:
+        pairs[(match['lost_item_id'], match['found_item_id'])] = match['score']
+    return [(lost_id, found_id, score) for (lost_id, found_id), score in pairs.items()]
+
+def _matches_changed(user_ids):
+    """Invalidate the users' matches-count ETags and refresh their open dashboards."""
+    bump(user_ids, 'matches')
+    publish(user_ids, 'matches')
+
+def _item_owners(cur, lost_ids, found_ids):
+    """user_ids owning any of the given lost / found items."""
+    lost_ids, found_ids = list(lost_ids), list(found_ids)
+    lost_placeholders = ", ".join(["%s"] * len(lost_ids))
+    found_placeholders = ", ".join(["%s"] * len(found_ids))
+    cur.execute(f"""
+        SELECT user_id FROM lost_items WHERE id IN ({lost_placeholders})
+        UNION
+        SELECT user_id FROM found_items WHERE id IN ({found_placeholders})
+    """, lost_ids + found_ids)
+    return {row['user_id'] for row in cur.fetchall() or []}
+
+def save_matches(matches, batch_size=SAVE_BATCH_SIZE):
+    """
+    Save matches to the database in bulk.
+    
+    Each batch is one multi-row INSERT ... ON DUPLICATE KEY UPDATE against
+    the unique (lost_item_id, found_item_id) key (added by migration 4,
+    `python -m commands.migrate`), so re-saving a pair only refreshes its
+    score and concurrent writers cannot create duplicates.
+    
+    Args:
+        matches (list): Match dictionaries with lost_item_id, found_item_id, and score
+        batch_size (int): Pairs written per statement
+    
+    Returns:
+        dict: {'saved': distinct pairs written, 'affected_rows': MySQL's
+        affected-row count for the upserts (1 per new pair, 2 per pair whose
+        score changed, 0 per pair saved with its current score)}
+    """
+    counts = {'saved': 0, 'affected_rows': 0}
     if not matches:
         print("No matches to save")
-        return
+        return counts
     
+    rows = _dedupe_pairs(matches)
+    owners = set()
     conn = get_db()
     cur = conn.cursor()
     try:
-        for match in matches:
-            # Check if match already exists
-            cur.execute("""
-                SELECT id FROM matches 
-                WHERE lost_item_id = %s AND found_item_id = %s
-            """, (match['lost_item_id'], match['found_item_id']))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            values_sql = ", ".join(["(%s, %s, %s, NOW())"] * len(batch))
+            cur.execute(f"""
+                INSERT INTO matches (lost_item_id, found_item_id, score, created_at)
+                VALUES {values_sql}
+                ON DUPLICATE KEY UPDATE score = VALUES(score)
+            """, [value for row in batch for value in row])
+            affected = cur.rowcount
+            conn.commit()
             
-            if not cur.fetchone():
-                cur.execute("""
-                    INSERT INTO matches (lost_item_id, found_item_id, score, created_at)
-                    VALUES (%s, %s, %s, NOW())
-                """, (match['lost_item_id'], match['found_item_id'], match['score']))
-                print(f"Saved match: Lost {match['lost_item_id']} ↔ Found {match['found_item_id']}")
-        
-        conn.commit()
-        print(f"Successfully saved {len(matches)} matches")
+            counts['saved'] += len(batch)
+            counts['affected_rows'] += affected
+            # Only batches that added a pair or changed a score alter anyone's dashboard
+            if affected:
+                owners |= _item_owners(cur, {row[0] for row in batch}, {row[1] for row in batch})
+        print(f"Saved {len(rows)} matches ({counts['affected_rows']} rows affected)")
+        after_commit(_matches_changed, owners)
     except Exception as e:
         conn.rollback()
         print(f"ERROR saving matches: {str(e)}")
     finally:
         cur.close()
         conn.close()
+    return counts
 
-def run_matching_pipeline(threshold=0.75):
-    """Run the complete matching pipeline"""
+def run_matching_pipeline(threshold=0.75, top_k=MATCH_TOP_K, found_top_k=MATCH_FOUND_TOP_K):
+    """Run the complete matching pipeline (see generate_matches for top_k / found_top_k)"""
     print("\n" + "="*60)
     print("STARTING MATCHING PIPELINE")
     print("="*60)
     
-    matches = generate_matches(threshold=threshold)
+    matches = generate_matches(threshold=threshold, top_k=top_k, found_top_k=found_top_k)
     save_matches(matches)
     
     print("="*60)
@@ -159,3 +477,127 @@ def run_matching_pipeline(threshold=0.75):
     print("="*60 + "\n")
     
     return matches
+
+
+def filter_unmatched_lost_ids(lost_ids):
+    """Return the subset of lost_ids that have no matches yet."""
+    lost_ids = list(lost_ids)
+    if not lost_ids:
+        return set()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(lost_ids))
+        cur.execute(f"""
+            SELECT DISTINCT lost_item_id FROM matches
+            WHERE lost_item_id IN ({placeholders})
+        """, lost_ids)
+        matched = {row['lost_item_id'] for row in cur.fetchall() or []}
+    finally:
+        cur.close()
+        conn.close()
+    return set(lost_ids) - matched
+
+def _to_matches(lost_id, found_id, score):
+    return {'lost_item_id': lost_id, 'found_item_id': found_id, 'score': round(score * 100, 2)}
+
+def _score_single_item(item, candidates, item_is_lost, threshold, limit=None):
+    """Score one item against the opposite table's candidates (1 x N)."""
+    label = 'lost' if item_is_lost else 'found'
+    item_ids, item_matrix = build_embedding_matrix([item], label=label)
+    cand_ids, cand_matrix = build_embedding_matrix(candidates, label='found' if item_is_lost else 'lost')
+
+    if not item_ids or not cand_ids or item_matrix.shape[1] != cand_matrix.shape[1]:
+        return []
+
+    if item_is_lost:
+        return score_pairs(item_ids, item_matrix, cand_ids, cand_matrix, threshold=threshold, top_k=limit)
+    return score_pairs(cand_ids, cand_matrix, item_ids, item_matrix, threshold=threshold, found_top_k=limit)
+
+def match_lost_item(lost_item_id, threshold=0.75, top_k=MATCH_TOP_K):
+    """
+    Incrementally match one newly reported or edited lost item.
+    
+    Only this item is scored (against every found item that passes the
+    category/date blocking rule), and only its new matches are written, so
+    the cost does not grow with the number of lost items. With
+    ANN_INDEX_ENABLED the found items are searched through the in-process
+    ANN index (services/item_index.py).
+    
+    Args:
+        lost_item_id (int): ID of the lost item to match
+        threshold (float): Similarity score threshold (0.0 to 1.0)
+        top_k (int, optional): Keep only this many best found items
+    
+    Returns:
+        list: Match dictionaries with lost_item_id, found_item_id, and score
+    """
+    item = get_lost_item(lost_item_id)
+    if not item:
+        print(f"[MATCH LOST] No embedding for lost item {lost_item_id}, skipping")
+        return []
+    
+    vector = decode_embedding(item['embedding'])
+    _sync_item('lost', lost_item_id, item['embedding'], vector)
+    lost_key = blocking_keys_from_rows([item], 'last_seen_at')[lost_item_id]
+    if ANN_INDEX_ENABLED:
+        hits = search_index('found', vector, threshold=threshold, k=None if MATCH_BLOCKING_ENABLED else top_k)
+        if MATCH_BLOCKING_ENABLED:
+            found_keys = get_blocking_keys('found', ids=[found_id for found_id, _ in hits])
+            hits = [(found_id, score) for found_id, score in hits
+                    if found_id in found_keys and pair_allowed(lost_key, found_keys[found_id])]
+        matches = [_to_matches(lost_item_id, found_id, score) for found_id, score in hits]
+        matches = matches[:top_k] if top_k else matches
+    else:
+        candidates = get_all_found_items()
+        if MATCH_BLOCKING_ENABLED:
+            found_keys = blocking_keys_from_rows(candidates, 'found_at')
+            candidates = [row for row in candidates if pair_allowed(lost_key, found_keys[row['id']])]
+        matches = _score_single_item(item, candidates, True, threshold, limit=top_k)
+    save_matches(matches)
+    print(f"[MATCH LOST] Lost item {lost_item_id}: {len(matches)} matches")
+    return matches
+
+def match_found_item(found_item_id, threshold=0.75, found_top_k=MATCH_FOUND_TOP_K):
+    """
+    Incrementally match one newly reported or edited found item.
+    
+    Only this item is scored, against the unmatched lost items (the same
+    candidate set run_matching_pipeline uses), and only its new matches
+    are written.
+    
+    Args:
+        found_item_id (int): ID of the found item to match
+        threshold (float): Similarity score threshold (0.0 to 1.0)
+        found_top_k (int, optional): Keep only this many best lost items
+    
+    Returns:
+        list: Match dictionaries with lost_item_id, found_item_id, and score
+    """
+    item = get_found_item(found_item_id)
+    if not item:
+        print(f"[MATCH FOUND] No embedding for found item {found_item_id}, skipping")
+        return []
+    
+    vector = decode_embedding(item['embedding'])
+    _sync_item('found', found_item_id, item['embedding'], vector)
+    found_key = blocking_keys_from_rows([item], 'found_at')[found_item_id]
+    if ANN_INDEX_ENABLED:
+        hits = search_index('lost', vector, threshold=threshold)
+        unmatched = filter_unmatched_lost_ids(lost_id for lost_id, _ in hits)
+        hits = [(lost_id, score) for lost_id, score in hits if lost_id in unmatched]
+        if MATCH_BLOCKING_ENABLED:
+            lost_keys = get_blocking_keys('lost', ids=[lost_id for lost_id, _ in hits])
+            hits = [(lost_id, score) for lost_id, score in hits
+                    if lost_id in lost_keys and pair_allowed(lost_keys[lost_id], found_key)]
+        matches = [_to_matches(lost_id, found_item_id, score) for lost_id, score in hits]
+        matches = matches[:found_top_k] if found_top_k else matches
+    else:
+        candidates = get_unmatched_lost_items()
+        if MATCH_BLOCKING_ENABLED:
+            lost_keys = blocking_keys_from_rows(candidates, 'last_seen_at')
+            candidates = [row for row in candidates if pair_allowed(lost_keys[row['id']], found_key)]
+        matches = _score_single_item(item, candidates, False, threshold, limit=found_top_k)
+    save_matches(matches)
+    print(f"[MATCH FOUND] Found item {found_item_id}: {len(matches)} matches")
+    return matches
@@ -0,0 +1,158 @@
+#notification_outbox.py
+import os
+
+from db import after_commit, get_db
+from services.jobs import enqueue
+from services.notifications import notifications_changed
+
+# Outbox rows moved into `notifications` per dispatcher transaction
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '200'))
+
+_table_ready = False
+
+# One row per recipient. A row is deleted in the same transaction that
+# inserts its notification, so each one is delivered exactly once.
+OUTBOX_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT UNSIGNED NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    title VARCHAR(150) NOT NULL,
+    message TEXT NOT NULL,
+    related_id INT UNSIGNED NULL,
+    created_at DATETIME NOT NULL
+)
+"""
+
+
+def ensure_outbox_table():
+    """Create the outbox table if it does not exist yet (also migration 6 in schema/migrations.py)."""
+    global _table_ready
+    if _table_ready:
+        return
+    # DDL commits implicitly, so keep it off a request's shared transaction
+    conn = get_db(scoped=False)
+    cur = conn.cursor()
+    try:
+        cur.execute(OUTBOX_TABLE_SQL)
+        conn.commit()
+        _table_ready = True
+    finally:
+        cur.close()
+        conn.close()
+
+
+def queue_notifications(user_ids, notification_type, title, message, related_id=None):
+    """
+    Write notifications to the outbox inside the caller's transaction.
+
+    Call it before the caller commits. The rows are written on the
+    caller's connection, so they commit with the caller's own changes and
+    are discarded with them on rollback. The dispatch job is only a
+    wake-up and is enqueued after the commit (see _wake_dispatcher).
+
+    Args:
+        user_ids (iterable): Recipients (duplicates and None are skipped)
+        notification_type (str): e.g. 'claim_approved'
+        title (str): Notification title
+        message (str): Notification body
+        related_id (int, optional): Id of the related claim / match / item
+
+    Returns:
+        int: Number of notifications queued
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return 0
+    ensure_outbox_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        rows = ', '.join(['(%s, %s, %s, %s, %s, NOW())'] * len(user_ids))
+        params = []
+        for user_id in user_ids:
+            params.extend((user_id, notification_type, title, message, related_id))
+        cur.execute(f"""
+            INSERT INTO notification_outbox (user_id, type, title, message, related_id, created_at)
+            VALUES {rows}
+        """, params)
+    finally:
+        cur.close()
+    after_commit(_wake_dispatcher)
+    print(f"[OUTBOX] Queued {notification_type} for {len(user_ids)} user(s) {user_ids}")
+    return len(user_ids)
+
+
+def _wake_dispatcher():
+    """
+    Queue the dispatch job. Queued dispatch jobs are merged into one row,
+    so this runs after the caller's commit: upserting that row inside every
+    claim transaction would serialize them all on its lock. A lost wake-up
+    is covered by the job worker's idle outbox sweep.
+    """
+    try:
+        enqueue('dispatch_notifications', dedupe_key='dispatch_notifications')
+    except Exception as e:
+        print(f"[OUTBOX] Could not queue the dispatch job ({e}); the worker's sweep will deliver")
+
+
+def dispatch_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Move up to batch_size outbox rows into `notifications` in one
+    transaction, then push the change to the recipients' open tabs.
+
+    SKIP LOCKED lets several dispatchers drain the outbox side by side
+    without taking the same rows.
+
+    Returns:
+        int: Number of notifications delivered
+    """
+    ensure_outbox_table()
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, user_id, type, title, message, related_id, created_at
+            FROM notification_outbox
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (batch_size,))
+        rows = cur.fetchall() or []
+        if not rows:
+            conn.commit()
+            return 0
+
+        values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+        params = []
+        for row in rows:
+            params.extend((row['user_id'], row['type'], row['title'], row['message'],
+                           row['related_id'], row['created_at']))
+        cur.execute(f"""
+            INSERT INTO notifications (user_id, type, title, message, related_id, created_at)
+            VALUES {values}
+        """, params)
+        ids = [row['id'] for row in rows]
+        cur.execute(f"DELETE FROM notification_outbox WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    notifications_changed(*[row['user_id'] for row in rows])
+    print(f"[OUTBOX] Delivered {len(rows)} notification(s)")
+    return len(rows)
+
+
+def dispatch_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """Deliver every pending outbox row, batch by batch. Returns the number delivered."""
+    delivered = 0
+    while True:
+        count = dispatch_batch(batch_size)
+        delivered += count
+        if count < batch_size:
+            return delivered
+
@@ -1,10 +1,120 @@
 import json
+import os
 from datetime import datetime
-from db import get_db
+from db import after_commit, get_db
+from services.local_store import get_store
+from services.pubsub import publish
+from services.user_versions import bump
+
+# Seconds a user's unread count + recent notifications stay cached (0 = no cache)
+NOTIFICATION_SUMMARY_TTL = int(os.getenv('NOTIFICATION_SUMMARY_TTL', '60'))
+# Seconds the list of admin user ids stays cached (0 = no cache)
+ADMIN_IDS_TTL = int(os.getenv('ADMIN_IDS_TTL', '300'))
+
+_ADMIN_IDS_KEY = 'admin_ids'
+
+
+def _summary_prefix(user_id):
+    return f"notif_summary:{user_id}:"
+
+
+def notifications_changed(*user_ids):
+    """
+    Drop the users' cached notification summaries and tell their open tabs
+    (see notifications_routes.notification_stream) to refresh.
+
+    The cache entries are dropped now and again once the surrounding
+    transaction commits, so another worker cannot re-cache the
+    pre-commit state in between; the push also waits for the commit.
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    if NOTIFICATION_SUMMARY_TTL:
+        for user_id in user_ids:
+            get_store().delete_prefix(_summary_prefix(user_id))
+    after_commit(_after_notifications_commit, *user_ids)
+
+
+def _unread_counts(user_ids):
+    """{user_id: unread count} in one grouped query."""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        placeholders = ', '.join(['%s'] * len(user_ids))
+        cur.execute(f"""
+            SELECT user_id, COUNT(*) AS count
+            FROM notifications
+            WHERE user_id IN ({placeholders}) AND read_at IS NULL
+            GROUP BY user_id
+        """, tuple(user_ids))
+        counts = {row['user_id']: row['count'] for row in cur.fetchall() or []}
+    finally:
+        cur.close()
+        conn.close()
+    return {user_id: counts.get(user_id, 0) for user_id in user_ids}
+
+
+def _after_notifications_commit(*user_ids):
+    if NOTIFICATION_SUMMARY_TTL:
+        for user_id in user_ids:
+            get_store().delete_prefix(_summary_prefix(user_id))
+    bump(user_ids, 'notifications')
+    # Send the new counts, instead of every open tab refetching them
+    try:
+        counts = _unread_counts(user_ids)
+    except Exception as e:
+        print(f"[NOTIFY] Could not load unread counts for users {list(user_ids)}: {e}")
+        counts = {}
+    for user_id in user_ids:
+        count = counts.get(user_id)
+        publish([user_id], 'notification', {'unread_count': count} if count is not None else None)
+
+
+def get_admin_ids():
+    """
+    Ids of the admin users, cached in the local store for ADMIN_IDS_TTL
+    seconds.
+
+    Only role changes made through admin.edit_user call admins_changed(),
+    which drops the cache on this host. An admin added or removed any other
+    way (directly in the database, or on another host) is picked up when
+    the entry expires, so new-claim notifications can reach the old set of
+    admins for up to ADMIN_IDS_TTL seconds. Set ADMIN_IDS_TTL=0 to read the
+    list on every call.
+    """
+    if ADMIN_IDS_TTL:
+        cached = get_store().get(_ADMIN_IDS_KEY)
+        if cached is not None:
+            return cached
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM users WHERE role='admin' ORDER BY id")
+        admin_ids = [row['id'] for row in cur.fetchall() or []]
+    finally:
+        cur.close()
+        conn.close()
+
+    if ADMIN_IDS_TTL:
+        get_store().set(_ADMIN_IDS_KEY, admin_ids, ttl=ADMIN_IDS_TTL)
+    return admin_ids
+
+
+def admins_changed():
+    """Drop the cached admin ids (now and once the surrounding transaction commits)."""
+    get_store().delete(_ADMIN_IDS_KEY)
+    after_commit(get_store().delete, _ADMIN_IDS_KEY)
+
 
 def notify(user_id, notification_type, title, message, related_id=None):
     """
     Insert a notification into the database for a specific user.
+
+    Notifications that go out with a claim or match change are queued with
+    notification_outbox.queue_notifications instead, so they commit (or
+    roll back) with that change and reach every recipient in one batch.
     """
     conn = get_db()
     cur = conn.cursor()
@@ -14,6 +124,7 @@ def notify(user_id, notification_type, title, message, related_id=None):
             VALUES (%s, %s, %s, %s, %s, NOW())
         """, (user_id, notification_type, title, message, related_id))
         conn.commit()
+        notifications_changed(user_id)
         print(f"[NOTIFY] Sent to user {user_id}: {title}")
         return True
     except Exception as e:
@@ -67,6 +178,174 @@ def get_recent_notifications(user_id, limit=10):
         conn.close()
 
 
+def get_notification_summary(user_id, limit=5):
+    """
+    Unread count and recent notifications for the navbar bell, cached per
+    user in the local store for NOTIFICATION_SUMMARY_TTL seconds.
+
+    Args:
+        user_id (int): Recipient
+        limit (int): Number of recent notifications
+
+    Returns:
+        dict: {'unread_count': int, 'recent': list of notification rows}
+    """
+    key = f"{_summary_prefix(user_id)}{limit}"
+    if NOTIFICATION_SUMMARY_TTL:
+        cached = get_store().get(key)
+        if cached is not None:
+            return cached
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT COUNT(*) AS count
+            FROM notifications
+            WHERE user_id = %s AND read_at IS NULL
+        """, (user_id,))
+        row = cur.fetchone()
+        cur.execute("""
+            SELECT id, type, title, message, related_id, created_at, read_at
+            FROM notifications
+            WHERE user_id = %s
+            ORDER BY read_at IS NULL DESC, created_at DESC
+            LIMIT %s
+        """, (user_id, limit))
+        summary = {'unread_count': row.get('count') if row else 0, 'recent': list(cur.fetchall() or [])}
+    finally:
+        cur.close()
+        conn.close()
+
+    if NOTIFICATION_SUMMARY_TTL:
+        get_store().set(key, summary, ttl=NOTIFICATION_SUMMARY_TTL)
+    return summary
+
+
+# Notification types counted separately on the notifications page
+COUNTED_TYPES = {
+    'approved_count': 'claim_approved',
+    'rejected_count': 'claim_rejected',
+    'pending_count': 'new_claim',
+}
+
+
+def get_notification_counters(user_id):
+    """
+    Total, unread and per-type counts for the notifications page, in one
+    conditional-aggregation pass over the user's notifications.
+
+    Returns:
+        dict: {'total_count', 'unread_count', 'approved_count', 'rejected_count', 'pending_count'}
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT COUNT(*) AS total_count,
+                   COALESCE(SUM(read_at IS NULL), 0) AS unread_count,
+                   COALESCE(SUM(type = %s), 0) AS approved_count,
+                   COALESCE(SUM(type = %s), 0) AS rejected_count,
+                   COALESCE(SUM(type = %s), 0) AS pending_count
+            FROM notifications
+            WHERE user_id = %s
+        """, (*COUNTED_TYPES.values(), user_id))
+        row = cur.fetchone() or {}
+    finally:
+        cur.close()
+        conn.close()
+    return {key: int(row.get(key) or 0) for key in ('total_count', 'unread_count', *COUNTED_TYPES)}
+
+
+def encode_page_cursor(notification):
+    """Keyset cursor for the page after `notification`: 'unread flag:created_at:id'."""
+    unread = 0 if notification.get('read_at') else 1
+    return f"{unread}:{notification['created_at']:%Y%m%d%H%M%S}:{notification['id']}"
+
+
+def decode_page_cursor(cursor):
+    """(unread, created_at, id) from encode_page_cursor(), or None if missing or malformed."""
+    try:
+        unread, created_at, notification_id = cursor.split(':')
+        return int(unread) == 1, datetime.strptime(created_at, '%Y%m%d%H%M%S'), int(notification_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def get_notifications_page(user_id, cursor=None, limit=50):
+    """
+    One page of a user's notifications, unread first, then newest first
+    (ORDER BY read_at IS NULL DESC, created_at DESC, id DESC).
+
+    Pages are keyset-paginated instead of using OFFSET: each page starts
+    right after the (read_at IS NULL, created_at, id) of the previous
+    page's last row. The unread and read parts are read separately so
+    each is a range scan on an index ending in created_at.
+
+    Args:
+        user_id (int): Recipient
+        cursor (str, optional): next_cursor of the previous page
+        limit (int): Page size
+
+    Returns:
+        tuple: (list of notification rows, next_cursor or None on the last page)
+    """
+    after = decode_page_cursor(cursor)
+    # Fetch one extra row to know whether there is a next page
+    wanted = limit + 1
+    rows = []
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        if after is None or after[0]:
+            if after is None:
+                cur.execute("""
+                    SELECT id, type, title, message, related_id, created_at, read_at
+                    FROM notifications
+                    WHERE user_id = %s AND read_at IS NULL
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (user_id, wanted))
+            else:
+                cur.execute("""
+                    SELECT id, type, title, message, related_id, created_at, read_at
+                    FROM notifications
+                    WHERE user_id = %s AND read_at IS NULL
+                      AND (created_at < %s OR (created_at = %s AND id < %s))
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (user_id, after[1], after[1], after[2], wanted))
+            rows.extend(cur.fetchall() or [])
+
+        if len(rows) < wanted:
+            if after is None or after[0]:
+                cur.execute("""
+                    SELECT id, type, title, message, related_id, created_at, read_at
+                    FROM notifications
+                    WHERE user_id = %s AND read_at IS NOT NULL
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (user_id, wanted - len(rows)))
+            else:
+                cur.execute("""
+                    SELECT id, type, title, message, related_id, created_at, read_at
+                    FROM notifications
+                    WHERE user_id = %s AND read_at IS NOT NULL
+                      AND (created_at < %s OR (created_at = %s AND id < %s))
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, (user_id, after[1], after[1], after[2], wanted - len(rows)))
+            rows.extend(cur.fetchall() or [])
+    finally:
+        cur.close()
+        conn.close()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_page_cursor(rows[-1])
+    return rows, None
+
+
 def mark_as_read(notification_id, user_id):
     """Mark a single notification as read."""
     conn = get_db()
@@ -78,7 +357,10 @@ def mark_as_read(notification_id, user_id):
             WHERE id = %s AND user_id = %s
         """, (notification_id, user_id))
         conn.commit()
-        return cur.rowcount > 0
+        changed = cur.rowcount > 0
+        if changed:
+            notifications_changed(user_id)
+        return changed
     except Exception as e:
         conn.rollback()
         print(f"[MARK_AS_READ] ERROR: {e}")
@@ -99,7 +381,10 @@ def mark_all_as_read(user_id):
             WHERE user_id = %s AND read_at IS NULL
         """, (user_id,))
         conn.commit()
-        return cur.rowcount > 0
+        changed = cur.rowcount > 0
+        if changed:
+            notifications_changed(user_id)
+        return changed
     except Exception as e:
         conn.rollback()
         print(f"[MARK_ALL_AS_READ] ERROR: {e}")
@@ -138,7 +423,10 @@ def delete_notification(notification_id, user_id):
             WHERE id = %s AND user_id = %s
         """, (notification_id, user_id))
         conn.commit()
-        return cur.rowcount > 0
+        changed = cur.rowcount > 0
+        if changed:
+            notifications_changed(user_id)
+        return changed
     except Exception as e:
         conn.rollback()
         print(f"[DELETE_NOTIFICATION] ERROR: {e}")
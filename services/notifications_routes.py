@@ -1,78 +1,54 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import json
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 import pymysql.cursors
-from db import get_db
+from db import get_db, release_request_connection
+from services.pubsub import latest_event_id, wait_for_events
+from services.user_versions import conditional_get
 from services.notifications import (
     get_recent_notifications, 
     mark_as_read, 
     mark_all_as_read,
     delete_notification,
-    get_notification_by_id
+    decode_page_cursor,
+    get_notification_by_id,
+    get_notification_counters,
+    get_notifications_page
 )
 
 notifications_bp = Blueprint('notifications', __name__, url_prefix='/notifications')
 
+# Seconds between keep-alive comments on an idle stream
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '20'))
+# Streams are closed after this long so worker threads are recycled; browsers reconnect on their own
+SSE_MAX_SECONDS = float(os.getenv('SSE_MAX_SECONDS', '300'))
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '3000'))
+# Open streams per worker process. Each holds a gunicorn thread, so keep this well below
+# GUNICORN_THREADS: the remaining threads serve pages. Over the cap a tab gets 204 and
+# falls back to (ETag) polling.
+SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '16'))
+
+_stream_slots = threading.BoundedSemaphore(max(SSE_MAX_STREAMS, 0) or 1)
+
 @notifications_bp.route('/')
 @login_required
 def notifications_page():
-    """Display all notifications for the current user"""
-    conn = get_db()
-    cur = conn.cursor(pymysql.cursors.DictCursor)
-    
-    try:
-        # Get all notifications for user
-        cur.execute("""
-            SELECT id, type, title, message, related_id, created_at, read_at
-            FROM notifications
-            WHERE user_id = %s
-            ORDER BY read_at IS NULL DESC, created_at DESC
-            LIMIT 50
-        """, (current_user.id,))
-        notifications = cur.fetchall() or []
-        
-        # Count unread notifications
-        cur.execute("""
-            SELECT COUNT(*) as count
-            FROM notifications
-            WHERE user_id = %s AND read_at IS NULL
-        """, (current_user.id,))
-        unread_count = cur.fetchone().get('count', 0)
-        
-        # Count approved claims
-        cur.execute("""
-            SELECT COUNT(*) as count
-            FROM notifications
-            WHERE user_id = %s AND type = 'claim_approved'
-        """, (current_user.id,))
-        approved_count = cur.fetchone().get('count', 0)
-        
-        # Count rejected claims
-        cur.execute("""
-            SELECT COUNT(*) as count
-            FROM notifications
-            WHERE user_id = %s AND type = 'claim_rejected'
-        """, (current_user.id,))
-        rejected_count = cur.fetchone().get('count', 0)
-        
-        # Count pending claims
-        cur.execute("""
-            SELECT COUNT(*) as count
-            FROM notifications
-            WHERE user_id = %s AND type = 'new_claim'
-        """, (current_user.id,))
-        pending_count = cur.fetchone().get('count', 0)
-        
-    finally:
-        cur.close()
-        conn.close()
-    
+    """Display the current user's notifications, one keyset page at a time"""
+    before = request.args.get('before')
+    notifications, next_cursor = get_notifications_page(current_user.id, cursor=before, limit=50)
+    counters = get_notification_counters(current_user.id)
+
     return render_template(
         'user/notifications.html',
         notifications=notifications,
-        unread_count=unread_count,
-        approved_count=approved_count,
-        rejected_count=rejected_count,
-        pending_count=pending_count
+        next_cursor=next_cursor,
+        # A missing or malformed cursor shows the first page
+        is_first_page=decode_page_cursor(before) is None,
+        **counters
     )
 
 @notifications_bp.route('/<int:notification_id>/read', methods=['POST'])
@@ -105,6 +81,7 @@ def delete_user_notification(notification_id):
     return redirect(request.referrer or url_for('notifications.notifications_page'))
 
 @notifications_bp.route('/api/recent', methods=['GET'])
+@conditional_get('notifications')
 @login_required
 def api_recent_notifications():
     """API endpoint to get recent notifications (for AJAX/dropdown)"""
@@ -147,3 +124,48 @@ def api_recent_notifications():
     finally:
         cur.close()
         conn.close()
+
+
+@notifications_bp.route('/stream')
+@login_required
+def notification_stream():
+    """
+    Server-Sent Events for the current user: 'notification' (with the new
+    unread_count) and 'matches' events, pushed by services.pubsub.
+    Replaces the dashboard's 30-second polling.
+    """
+    # 204 tells EventSource not to reconnect; the dashboard then polls instead
+    if SSE_MAX_STREAMS <= 0 or not _stream_slots.acquire(blocking=False):
+        return Response(status=204)
+
+    user_id = current_user.id
+    # On reconnect the browser sends the last id it saw, so nothing published in between is lost
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = latest_event_id()
+    # The stream outlives this request; don't keep a pooled connection for it
+    release_request_connection()
+
+    def generate(last_id):
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = wait_for_events(user_id, last_id, timeout=min(SSE_HEARTBEAT_SECONDS, remaining))
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last_id = event['id']
+                yield f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event['data'] or {})}\n\n"
+
+    response = Response(generate(last_id), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop nginx-style proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
+    # The server closes the response when the stream ends or the client goes away
+    response.call_on_close(_stream_slots.release)
+    return response
@@ -0,0 +1,80 @@
+#onnx_encoder.py
+import os
+
+import numpy as np
+
+# Directory written by commands/export_onnx.py
+EMBEDDING_ONNX_DIR = os.getenv('EMBEDDING_ONNX_DIR', os.path.join('instance', 'onnx', 'all-MiniLM-L6-v2'))
+# model_int8.onnx (dynamic int8 quantization) or model.onnx (fp32 export)
+EMBEDDING_ONNX_FILE = os.getenv('EMBEDDING_ONNX_FILE', 'model_int8.onnx')
+EMBEDDING_ONNX_THREADS = int(os.getenv('EMBEDDING_ONNX_THREADS', '0'))
+
+# Same limit as the sentence-transformers config of all-MiniLM-L6-v2
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxSentenceEncoder:
+    """
+    CPU sentence encoder running an exported all-MiniLM-L6-v2 through onnxruntime.
+
+    Reproduces the SentenceTransformer pipeline of that model (tokenize,
+    transformer, attention-masked mean pooling, L2 normalize) and exposes
+    the two methods the app uses: encode() and
+    get_sentence_embedding_dimension(). Only onnxruntime and the
+    `tokenizers` package are imported, not torch or transformers.
+    """
+
+    def __init__(self, model_dir=EMBEDDING_ONNX_DIR, model_file=EMBEDDING_ONNX_FILE,
+                 threads=EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"{model_path} not found; run `python -m commands.export_onnx` first"
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, 'tokenizer.json'))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        feed = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        token_embeddings = self.session.run(None, {k: v for k, v in feed.items() if k in self._input_names})[0]
+
+        mask = feed['attention_mask'][:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        """Encode a string (returns a vector) or a list of strings (returns a matrix)."""
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        # Sort by length so each batch pads to a similar length
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+        return out[0] if single else out
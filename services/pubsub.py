@@ -0,0 +1,145 @@
+#pubsub.py
+import json
+import os
+import threading
+import time
+
+from services.local_store import get_store
+
+# How often each process checks the shared event log for events published by other processes
+PUBSUB_POLL_SECONDS = float(os.getenv('PUBSUB_POLL_SECONDS', '0.25'))
+# Events older than this are purged (a reconnecting client can catch up within this window)
+PUBSUB_RETENTION_SECONDS = int(os.getenv('PUBSUB_RETENTION_SECONDS', '600'))
+
+# Purge old events every this many publishes
+_PURGE_EVERY = 200
+
+_cond = threading.Condition()
+_latest_id = 0
+_watcher_pid = None
+_ready_pid = None
+_publishes = 0
+
+
+def _events_db():
+    global _ready_pid
+    conn = get_store().connection()
+    if _ready_pid != os.getpid():
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_user_id ON events (user_id, id)")
+        _ready_pid = os.getpid()
+    return conn
+
+
+def _wake(event_id):
+    global _latest_id
+    with _cond:
+        if event_id > _latest_id:
+            _latest_id = event_id
+            _cond.notify_all()
+
+
+def publish(user_ids, kind, data=None):
+    """
+    Push an event to the open streams of the given users, in every worker
+    process on this host.
+
+    Call it once the change is committed (see db.after_commit), or a
+    client may refetch before it can see the change.
+
+    Args:
+        user_ids (iterable): Recipients
+        kind (str): Event name, e.g. 'notification' or 'matches'
+        data (dict, optional): JSON-serializable payload
+    """
+    global _publishes
+    user_ids = sorted({int(user_id) for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return
+    payload = json.dumps(data) if data is not None else None
+    try:
+        conn = _events_db()
+        now = time.time()
+        conn.executemany("INSERT INTO events (user_id, kind, data, created_at) VALUES (?, ?, ?, ?)",
+                         [(user_id, kind, payload, now) for user_id in user_ids])
+        event_id = conn.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+        _publishes += 1
+        if _publishes >= _PURGE_EVERY:
+            _publishes = 0
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - PUBSUB_RETENTION_SECONDS,))
+    except Exception as e:
+        print(f"[PUBSUB] ERROR publishing {kind} to {user_ids}: {e}")
+        return
+    _wake(event_id)
+
+
+def latest_event_id():
+    """Id of the newest event (0 if none); new subscribers start after it."""
+    try:
+        return _events_db().execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+    except Exception as e:
+        print(f"[PUBSUB] ERROR reading event log: {e}")
+        return 0
+
+
+def _watch():
+    # One thread per process turns writes by other processes into local wake-ups
+    while True:
+        time.sleep(PUBSUB_POLL_SECONDS)
+        event_id = latest_event_id()
+        if event_id:
+            _wake(event_id)
+
+
+def _ensure_watcher():
+    global _watcher_pid
+    with _cond:
+        if _watcher_pid == os.getpid():
+            return
+        _watcher_pid = os.getpid()
+    threading.Thread(target=_watch, name='pubsub-watcher', daemon=True).start()
+
+
+def wait_for_events(user_id, after_id, timeout):
+    """
+    Block until the user has events newer than after_id, or timeout.
+
+    Only the shared MAX(id) is polled; the user's own events are read
+    when something new was published.
+
+    Returns:
+        list: [{'id', 'kind', 'data'}] oldest first (empty on timeout)
+    """
+    _ensure_watcher()
+    deadline = time.monotonic() + timeout
+    checked = -1
+    while True:
+        with _cond:
+            latest = _latest_id
+        if latest != checked:
+            checked = latest
+            try:
+                rows = _events_db().execute(
+                    "SELECT id, kind, data FROM events WHERE user_id = ? AND id > ? ORDER BY id",
+                    (int(user_id), after_id),
+                ).fetchall()
+            except Exception as e:
+                print(f"[PUBSUB] ERROR reading events for user {user_id}: {e}")
+                rows = []
+            if rows:
+                return [{'id': row[0], 'kind': row[1], 'data': json.loads(row[2]) if row[2] else None}
+                        for row in rows]
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        with _cond:
+            if _latest_id == checked:
+                _cond.wait(remaining)
@@ -0,0 +1,192 @@
+#similarity.py
+import os
+import numpy as np
+
+from services.embeddings import decode_embedding
+
+# Upper bound (in MB) for one block of the lost x found score matrix
+DEFAULT_MEMORY_MB = int(os.getenv('MATCHING_MEMORY_MB', '64'))
+
+
+def _row_value(row, key, index):
+    """Read a column from a DictCursor row or a plain tuple row."""
+    if isinstance(row, dict):
+        return row.get(key)
+    return row[index] if row and len(row) > index else None
+
+
+def build_embedding_matrix(items, label='item'):
+    """
+    Decode every item's embedding exactly once into an L2-normalized matrix.
+
+    Args:
+        items (list): Rows with 'id' (index 0) and 'embedding' (index 5)
+        label (str): Name used in error messages ('lost' / 'found')
+
+    Returns:
+        tuple: (ids list, float32 matrix of shape (len(ids), dim))
+    """
+    ids = []
+    vectors = []
+    dim = None
+
+    for item in items:
+        item_id = _row_value(item, 'id', 0)
+        raw = _row_value(item, 'embedding', 5)
+        if not item_id or not raw:
+            continue
+
+        try:
+            vec = decode_embedding(raw).ravel()
+        except (ValueError, TypeError):
+            print(f"ERROR: Could not deserialize embedding for {label} item {item_id}")
+            continue
+
+        if dim is None:
+            dim = vec.shape[0]
+        if vec.shape[0] != dim or dim == 0:
+            print(f"ERROR: Embedding for {label} item {item_id} has dimension {vec.shape[0]}, expected {dim}")
+            continue
+
+        ids.append(item_id)
+        vectors.append(vec)
+
+    if not vectors:
+        return [], np.zeros((0, dim or 0), dtype=np.float32)
+
+    matrix = np.vstack(vectors)
+    return ids, normalize_rows(matrix)
+
+
+def normalize_rows(matrix):
+    """L2-normalize each row in place (zero rows are left as zeros)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _block_shape(n_rows, n_cols, memory_mb):
+    """Pick (row_block, col_block) so one float32 score block fits in memory_mb."""
+    budget = max(1, int(memory_mb * 1024 * 1024) // 4)
+    if n_cols <= budget:
+        return max(1, min(n_rows, budget // max(n_cols, 1))), n_cols
+    return 1, budget
+
+
+def iter_score_blocks(left, right, memory_mb=None):
+    """
+    Yield cosine-similarity blocks of left @ right.T within a memory budget.
+
+    Both matrices must already be L2-normalized (see build_embedding_matrix).
+
+    Yields:
+        tuple: (row_offset, col_offset, float32 block of scores)
+    """
+    memory_mb = memory_mb or DEFAULT_MEMORY_MB
+    n_rows, n_cols = left.shape[0], right.shape[0]
+    if n_rows == 0 or n_cols == 0:
+        return
+
+    row_block, col_block = _block_shape(n_rows, n_cols, memory_mb)
+    for r0 in range(0, n_rows, row_block):
+        rows = left[r0:r0 + row_block]
+        for c0 in range(0, n_cols, col_block):
+            yield r0, c0, rows @ right[c0:c0 + col_block].T
+
+
+def _top_k_mask(block, k, axis):
+    """Boolean mask of the k highest scores along `axis` of a score block."""
+    if k >= block.shape[axis]:
+        return np.ones(block.shape, dtype=bool)
+    best = np.argpartition(-block, k - 1, axis=axis)
+    best = best[:, :k] if axis == 1 else best[:k]
+    mask = np.zeros(block.shape, dtype=bool)
+    np.put_along_axis(mask, best, True, axis=axis)
+    return mask
+
+
+def keep_top_k(groups, scores, k):
+    """
+    Select the k highest-scoring entries within each group.
+
+    Args:
+        groups (np.ndarray): Group key of every entry (e.g. the lost row index)
+        scores (np.ndarray): Score of every entry
+        k (int): Entries kept per group
+
+    Returns:
+        np.ndarray: Indices of the kept entries
+    """
+    if groups.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    order = np.lexsort((-scores, groups))
+    sorted_groups = groups[order]
+    starts = np.r_[0, np.nonzero(sorted_groups[1:] != sorted_groups[:-1])[0] + 1]
+    group_start = np.repeat(starts, np.diff(np.r_[starts, sorted_groups.size]))
+    rank = np.arange(sorted_groups.size) - group_start
+    return np.sort(order[rank < k])
+
+
+def score_pairs(lost_ids, lost_matrix, found_ids, found_matrix, threshold=0.75, memory_mb=None,
+                top_k=None, found_top_k=None, pair_mask=None):
+    """
+    Score every lost x found pair with blocked matrix multiplies.
+
+    With top_k only the k best pairs per lost item are kept (a partial sort
+    of each score block, then a merge across blocks); found_top_k then caps
+    how many of those pairs each found item keeps. threshold is the score
+    floor in both modes.
+
+    Args:
+        lost_ids (list): Lost item ids, one per row of lost_matrix
+        lost_matrix (np.ndarray): Normalized lost embeddings
+        found_ids (list): Found item ids, one per row of found_matrix
+        found_matrix (np.ndarray): Normalized found embeddings
+        threshold (float): Similarity score threshold (0.0 to 1.0)
+        memory_mb (int, optional): Memory budget for one score block
+        top_k (int, optional): Best pairs kept per lost item
+        found_top_k (int, optional): Best pairs kept per found item
+        pair_mask (callable, optional): pair_mask(row_offset, col_offset, block)
+            returns a boolean array; False pairs are dropped before top-k
+
+    Returns:
+        list: Match dictionaries with lost_item_id, found_item_id, and score
+    """
+    rows_out, cols_out, scores_out = [], [], []
+    for r0, c0, block in iter_score_blocks(lost_matrix, found_matrix, memory_mb):
+        keep = block >= threshold
+        if pair_mask is not None:
+            keep &= pair_mask(r0, c0, block)
+            block = np.where(keep, block, -np.inf)
+        if top_k:
+            keep &= _top_k_mask(block, top_k, axis=1)
+        elif found_top_k:
+            keep &= _top_k_mask(block, found_top_k, axis=0)
+        rows, cols = np.nonzero(keep)
+        rows_out.append(rows + r0)
+        cols_out.append(cols + c0)
+        scores_out.append(block[rows, cols])
+
+    if not rows_out:
+        return []
+    rows = np.concatenate(rows_out)
+    cols = np.concatenate(cols_out)
+    scores = np.concatenate(scores_out)
+
+    # Blocks only see part of each row/column, so trim again over the merged candidates
+    if top_k:
+        kept = keep_top_k(rows, scores, top_k)
+        rows, cols, scores = rows[kept], cols[kept], scores[kept]
+    if found_top_k:
+        kept = keep_top_k(cols, scores, found_top_k)
+        rows, cols, scores = rows[kept], cols[kept], scores[kept]
+
+    return [
+        {
+            'lost_item_id': lost_ids[r],
+            'found_item_id': found_ids[c],
+            'score': round(s * 100, 2)
+        }
+        for r, c, s in zip(rows.tolist(), cols.tolist(), scores.astype(np.float64).tolist())
+    ]
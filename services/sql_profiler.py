@@ -0,0 +1,147 @@
+#sql_profiler.py
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Time every statement run on a request's connection (see db.RequestConnection.cursor)
+SQL_PROFILING = os.getenv('SQL_PROFILING', '1') == '1'
+# Add X-DB-Queries / Server-Timing headers to every response
+SQL_PROFILE_HEADERS = os.getenv('SQL_PROFILE_HEADERS', '1') == '1'
+# Statements slower than this are printed as they finish
+SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', '200'))
+# The same statement (ignoring parameters) this many times in one request is flagged as N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', '3'))
+# Request profiles kept per process for /admin/sql-profile
+SQL_PROFILE_HISTORY = int(os.getenv('SQL_PROFILE_HISTORY', '50'))
+SLOWEST_KEPT = 5
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_history = deque(maxlen=SQL_PROFILE_HISTORY)
+_history_lock = threading.Lock()
+
+
+def _caller():
+    """file:line (function) of the app code that ran the statement."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return f"{frame.f_code.co_filename.replace(_ROOT, '')}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+class QueryStats:
+    """Statements run while serving one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}        # sql -> {'count', 'seconds', 'where'}
+        self.slowest = []           # [(seconds, sql, where)], longest first
+
+    def record(self, sql, seconds, where=None):
+        sql = ' '.join(str(sql).split())
+        self.count += 1
+        self.seconds += seconds
+        entry = self.statements.get(sql)
+        if entry is None:
+            entry = self.statements[sql] = {'count': 0, 'seconds': 0.0, 'where': where}
+        entry['count'] += 1
+        entry['seconds'] += seconds
+        if len(self.slowest) < SLOWEST_KEPT or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, sql, where))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[SLOWEST_KEPT:]
+        if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+            print(f"[SQL] Slow query {seconds * 1000:.1f} ms at {where}: {sql[:200]}")
+
+    def n_plus_one(self):
+        """Statements repeated at least SQL_N_PLUS_ONE_THRESHOLD times, most repeated first."""
+        repeated = [
+            {'sql': sql, 'count': entry['count'], 'ms': round(entry['seconds'] * 1000, 2), 'where': entry['where']}
+            for sql, entry in self.statements.items()
+            if entry['count'] >= SQL_N_PLUS_ONE_THRESHOLD
+        ]
+        return sorted(repeated, key=lambda item: item['count'], reverse=True)
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 2),
+            'distinct_statements': len(self.statements),
+            'n_plus_one': self.n_plus_one(),
+            'slowest': [{'ms': round(seconds * 1000, 2), 'sql': sql, 'where': where}
+                        for seconds, sql, where in self.slowest],
+        }
+
+
+class ProfiledCursor:
+    """Cursor wrapper that times execute()/executemany() into a QueryStats."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._cursor.close()
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._stats.record(query, time.perf_counter() - started, _caller())
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._stats.record(query, time.perf_counter() - started, _caller())
+
+
+def finish_request(stats, request, response):
+    """
+    Attach the request's query summary to the response headers, log N+1
+    patterns and keep the profile for /admin/sql-profile.
+    """
+    summary = stats.summary()
+    if SQL_PROFILE_HEADERS:
+        response.headers['X-DB-Queries'] = str(summary['queries'])
+        response.headers.add('Server-Timing', f'db;desc="{summary["queries"]} queries";dur={summary["db_ms"]}')
+        if summary['n_plus_one']:
+            response.headers['X-DB-N-Plus-One'] = str(len(summary['n_plus_one']))
+    for item in summary['n_plus_one']:
+        print(f"[SQL] Possible N+1 in {request.endpoint}: {item['count']}x at {item['where']}: {item['sql'][:160]}")
+
+    summary.update(
+        method=request.method,
+        path=request.path,
+        endpoint=request.endpoint,
+        status=response.status_code,
+        at=time.strftime('%Y-%m-%d %H:%M:%S'),
+    )
+    with _history_lock:
+        _history.append(summary)
+    return response
+
+
+def recent_profiles(limit=None, endpoint=None):
+    """Most recent request profiles first, optionally for one endpoint."""
+    with _history_lock:
+        profiles = list(_history)
+    profiles.reverse()
+    if endpoint:
+        profiles = [profile for profile in profiles if profile['endpoint'] == endpoint]
+    return profiles[:limit] if limit else profiles
@@ -0,0 +1,99 @@
+#user_versions.py
+import time
+import zlib
+from functools import wraps
+
+from flask import make_response, request, session
+
+from db import after_commit, get_db
+from services.local_store import get_store
+
+# What a version covers: 'notifications' (insert/read/delete) and 'matches' (matches and claims)
+SCOPES = ('notifications', 'matches')
+
+
+def _key(scope, user_id):
+    return f"user_version:{scope}:{int(user_id)}"
+
+
+def _seed():
+    # Counters start at the current time in ms, so ETags handed out before the
+    # store was wiped (new container, deleted file) are never reused
+    return int(time.time() * 1000)
+
+
+def get_version(user_id, scope):
+    """Current version of a user's data in `scope` (a local store lookup)."""
+    store = get_store()
+    version = store.get(_key(scope, user_id))
+    if version is None:
+        store.add(_key(scope, user_id), _seed())
+        version = store.get(_key(scope, user_id), 0)
+    return version
+
+
+def bump(user_ids, scope):
+    """Invalidate the ETags of these users' `scope` endpoints (call after commit)."""
+    store = get_store()
+    for user_id in {int(user_id) for user_id in user_ids if user_id is not None}:
+        store.incr(_key(scope, user_id), initial=_seed())
+
+
+def bump_after_commit(user_ids, scope):
+    """
+    bump() once the surrounding transaction commits. Bumping earlier
+    would let a poll in between cache pre-commit data under the new ETag.
+    """
+    after_commit(bump, list(user_ids), scope)
+
+
+def item_owners(lost_item_id=None, found_item_id=None):
+    """user_ids owning the given lost / found item."""
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT user_id FROM lost_items WHERE id = %s
+            UNION
+            SELECT user_id FROM found_items WHERE id = %s
+        """, (lost_item_id, found_item_id))
+        return {row['user_id'] for row in cur.fetchall() or []}
+    finally:
+        cur.close()
+        conn.close()
+
+
+def claims_changed(lost_item_id=None, found_item_id=None, user_ids=()):
+    """Bump the 'matches' version of a claim's item owners and of user_ids (e.g. the claimant)."""
+    owners = item_owners(lost_item_id, found_item_id) if (lost_item_id or found_item_id) else set()
+    bump_after_commit(owners | set(user_ids), 'matches')
+
+
+def conditional_get(scope):
+    """
+    Answer `If-None-Match` with 304 from the user's `scope` version alone.
+
+    Must sit above @login_required: the user id comes from the signed
+    session cookie, so an unchanged poll never loads the user or opens a
+    MySQL connection. Other responses get a weak ETag and
+    `Cache-Control: private, no-cache`, so browsers revalidate every poll.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            user_id = session.get('_user_id')
+            if user_id is None:
+                return view(*args, **kwargs)
+            # Different query strings (e.g. ?limit=) return different bodies
+            etag = f"{scope}-{user_id}-{get_version(user_id, scope)}-{zlib.crc32(request.query_string):x}"
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,149 @@
+#warmup.py
+import os
+import socket
+import threading
+import time
+
+# Load the matching matrices (embedding store + ANN indexes) during warm-up.
+# Matching only runs in the web process with JOBS_INLINE=1, so that is the default.
+WARMUP_MATRICES = os.getenv('WARMUP_MATRICES', os.getenv('JOBS_INLINE', '0')) == '1'
+
+_lock = threading.Lock()
+_status = {
+    'state': 'not_started',     # not_started | warming | ready | failed
+    'warmed_in_pid': None,
+    'model': {},
+    'matrices': {},
+    'errors': [],
+    'seconds': None,
+}
+
+
+def _warm_model():
+    from services.embeddings import EMBEDDING_BACKEND, EMBEDDING_SOCKET, get_model
+
+    info = {'backend': EMBEDDING_BACKEND, 'mode': 'remote' if EMBEDDING_SOCKET else 'local'}
+    if EMBEDDING_SOCKET:
+        # The embedding server owns the model; loading it here would defeat the point
+        info['loaded'] = server_reachable()
+        return info
+
+    started = time.perf_counter()
+    model = get_model()
+    info['load_seconds'] = round(time.perf_counter() - started, 3)
+    started = time.perf_counter()
+    model.encode(["Name: warm-up. Description: first forward pass"], batch_size=1)
+    info['first_encode_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    started = time.perf_counter()
+    model.encode(["Name: warm-up. Description: second forward pass"], batch_size=1)
+    info['warm_encode_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    info['loaded'] = True
+    return info
+
+
+def _warm_matrices():
+    from services.embedding_store import EMBEDDING_STORE_ENABLED, get_store
+    from services.item_index import ANN_INDEX_ENABLED, get_index
+
+    info = {}
+    started = time.perf_counter()
+    for kind in ('lost', 'found'):
+        if EMBEDDING_STORE_ENABLED:
+            ids, matrix = get_store(kind).get_matrix()
+            if len(ids):
+                # Touch every page so the memory map is resident before the first request
+                matrix.sum()
+            info[f'{kind}_store_vectors'] = len(ids)
+        if ANN_INDEX_ENABLED:
+            index = get_index(kind)
+            info[f'{kind}_index_vectors'] = len(index) if index is not None else 0
+    info['seconds'] = round(time.perf_counter() - started, 3)
+    return info
+
+
+def warm_up(model=True, matrices=None):
+    """
+    Load and exercise the sentence encoder (and optionally the matching
+    matrices) so the first real request does not pay for it.
+
+    Called in the gunicorn master before workers fork (see
+    gunicorn.conf.py), so workers share the loaded pages copy-on-write,
+    and at job worker start. Failures are recorded, not raised.
+
+    Args:
+        model (bool): Load the encoder and run two forward passes
+        matrices (bool, optional): Load the embedding store / ANN indexes
+            (defaults to WARMUP_MATRICES)
+
+    Returns:
+        dict: The readiness status (see readiness())
+    """
+    matrices = WARMUP_MATRICES if matrices is None else matrices
+    with _lock:
+        _status.update(state='warming', warmed_in_pid=os.getpid(), errors=[])
+    started = time.perf_counter()
+    errors = []
+
+    if model:
+        try:
+            _status['model'] = _warm_model()
+        except Exception as e:
+            errors.append(f"model: {e}")
+    if matrices:
+        try:
+            _status['matrices'] = _warm_matrices()
+        except Exception as e:
+            errors.append(f"matrices: {e}")
+
+    with _lock:
+        _status.update(
+            state='failed' if errors else 'ready',
+            errors=errors,
+            seconds=round(time.perf_counter() - started, 3),
+        )
+    print(f"[WARMUP] {_status['state']} in {_status['seconds']}s: model={_status['model']} "
+          f"matrices={_status['matrices']} errors={errors}")
+    return readiness()
+
+
+def warm_up_in_background():
+    """Start warm_up() in a thread unless it already ran or is running in this process tree."""
+    with _lock:
+        if _status['state'] != 'not_started':
+            return False
+        _status['state'] = 'warming'
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+    return True
+
+
+def server_reachable(timeout=1.0):
+    """True if the embedding server answers a stats request on EMBEDDING_SOCKET."""
+    from services.embeddings import EMBEDDING_SOCKET, recv_message, send_message
+
+    if not EMBEDDING_SOCKET:
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(EMBEDDING_SOCKET)
+            send_message(sock, {'stats': True})
+            header, _ = recv_message(sock)
+        return bool(header.get('ok'))
+    except (OSError, ValueError):
+        return False
+
+
+def readiness():
+    """
+    Current warm-up status for /healthz/ready.
+
+    In remote mode (EMBEDDING_SOCKET) the embedding server is pinged on
+    every call, since it can restart independently of this process.
+    """
+    status = {key: (dict(value) if isinstance(value, dict) else value) for key, value in _status.items()}
+    status['pid'] = os.getpid()
+    status['preloaded'] = status['warmed_in_pid'] not in (None, status['pid'])
+    if status['model'].get('mode') == 'remote':
+        status['model']['loaded'] = server_reachable()
+    status['ready'] = status['state'] == 'ready' and bool(status['model'].get('loaded', True))
+    return status
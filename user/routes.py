@@ -9,8 +9,9 @@ from db import get_db
 from models.user import FoundItem, LostItem
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from services.embeddings import compute_embedding, compute_item_embedding
-from services.matching import run_matching_pipeline
+from services.job_handlers import enqueue_item_embedding, enqueue_item_removal
+from services.jobs import get_latest_job
+from services.user_versions import bump_after_commit, conditional_get
 
 
 # Create a Blueprint named "user" with updated template folder
@@ -241,22 +242,6 @@ def report_lost():
         result = cur.fetchone()
         item_id = result.get('LAST_INSERT_ID()') if isinstance(result, dict) else result[0]
 
-        # Compute unified embedding for all fields (name, description, location, date)
-        print(f"\n[LOST] Computing unified embedding for item {item_id}...")
-        print(f"[LOST]   - Name: {name}")
-        print(f"[LOST]   - Description: {description}")
-        print(f"[LOST]   - Location: {last_seen}")
-        print(f"[LOST]   - Date: {last_seen_at}")
-        
-        emb = compute_item_embedding(name, description, last_seen, last_seen_at)
-        
-        if emb:
-            emb_json = json.dumps(emb)
-            cur.execute("UPDATE lost_items SET embedding=%s WHERE id=%s", (emb_json, item_id))
-            conn.commit()
-            print(f"[LOST] ✓ Unified embedding saved for item {item_id}")
-        else:
-            print(f"[LOST] ✗ Failed to compute embedding")
     except Exception as e:
         print(f"[LOST] ERROR: {str(e)}")
         conn.rollback()
@@ -265,12 +250,11 @@ def report_lost():
     finally:
         cur.close(); conn.close()
 
-    # Run matching pipeline
-    print(f"[LOST] Triggering matching pipeline...")
+    # Embedding + matching run in the background worker
     try:
-        run_matching_pipeline(threshold=0.75)
+        enqueue_item_embedding('lost', item_id)
     except Exception as e:
-        print(f"[LOST] Matching pipeline error: {str(e)}")
+        print(f"[LOST] Could not queue embedding job: {str(e)}")
 
     flash('Lost item reported successfully.', 'success')
     return redirect(url_for('user.my_lost_items'))
@@ -306,22 +290,6 @@ def report_found():
         result = cur.fetchone()
         item_id = result.get('LAST_INSERT_ID()') if isinstance(result, dict) else result[0]
 
-        # Compute unified embedding for all fields (name, description, location, date)
-        print(f"\n[FOUND] Computing unified embedding for item {item_id}...")
-        print(f"[FOUND]   - Name: {name}")
-        print(f"[FOUND]   - Description: {description}")
-        print(f"[FOUND]   - Location: {where_found}")
-        print(f"[FOUND]   - Date: {found_at}")
-        
-        emb = compute_item_embedding(name, description, where_found, found_at)
-        
-        if emb:
-            emb_json = json.dumps(emb)
-            cur.execute("UPDATE found_items SET embedding=%s WHERE id=%s", (emb_json, item_id))
-            conn.commit()
-            print(f"[FOUND] ✓ Unified embedding saved for item {item_id}")
-        else:
-            print(f"[FOUND] ✗ Failed to compute embedding")
     except Exception as e:
         print(f"[FOUND] ERROR: {str(e)}")
         conn.rollback()
@@ -330,12 +298,11 @@ def report_found():
     finally:
         cur.close(); conn.close()
 
-    # Run matching pipeline
-    print(f"[FOUND] Triggering matching pipeline...")
+    # Embedding + matching run in the background worker
     try:
-        run_matching_pipeline(threshold=0.75)
+        enqueue_item_embedding('found', item_id)
     except Exception as e:
-        print(f"[FOUND] Matching pipeline error: {str(e)}")
+        print(f"[FOUND] Could not queue embedding job: {str(e)}")
 
     flash('Found item reported successfully!', 'success')
     return redirect(url_for('user.my_found_items'))
@@ -401,9 +368,18 @@ def delete_lost_item(item_id):
             photo = row.get('photo')
 
     cur.execute("DELETE FROM lost_items WHERE id=%s AND user_id=%s", (item_id, current_user.id))
+    deleted = cur.rowcount > 0
+    if deleted:
+        bump_after_commit([current_user.id], 'matches')
     conn.commit()
     cur.close(); conn.close()
 
+    if deleted:
+        try:
+            enqueue_item_removal('lost', item_id)
+        except Exception as e:
+            print(f"[LOST DELETE] Could not queue removal job: {str(e)}")
+
     if photo:
         try:
             os.remove(os.path.join(UPLOADS_DIR, photo))
@@ -472,16 +448,7 @@ def update_found_item(id):
                 where_found=%s, found_at=%s
             WHERE id=%s AND user_id=%s
         """, (name, category, description, where_found, found_at, id, current_user.id))
-        
-        # Recompute unified embedding with updated fields
-        print(f"\n[FOUND UPDATE] Computing unified embedding for item {id}...")
-        emb = compute_item_embedding(name, description, where_found, found_at)
-        
-        if emb:
-            emb_json = json.dumps(emb)
-            cur.execute("UPDATE found_items SET embedding=%s WHERE id=%s", (emb_json, id))
-            print(f"[FOUND UPDATE] ✓ Unified embedding updated for item {id}")
-        
+        updated = cur.rowcount > 0
         conn.commit()
     except Exception as e:
         print(f"[FOUND UPDATE] ERROR: {str(e)}")
@@ -491,6 +458,13 @@ def update_found_item(id):
     finally:
         cur.close(); conn.close()
 
+    # Re-embedding + matching run in the background worker
+    if updated:
+        try:
+            enqueue_item_embedding('found', id)
+        except Exception as e:
+            print(f"[FOUND UPDATE] Could not queue embedding job: {str(e)}")
+
     flash('Found item updated successfully!', 'success')
     return redirect(url_for('user.my_found_items'))
 
@@ -512,16 +486,7 @@ def update_lost_item(item_id):
                 SET name=%s, category=%s, last_seen=%s, last_seen_at=%s, description=%s
                 WHERE id=%s AND user_id=%s
             """, (name, category, last_seen, last_seen_at, description, item_id, current_user.id))
-            
-            # Recompute unified embedding with updated fields
-            print(f"\n[LOST UPDATE] Computing unified embedding for item {item_id}...")
-            emb = compute_item_embedding(name, description, last_seen, last_seen_at)
-            
-            if emb:
-                emb_json = json.dumps(emb)
-                cur.execute("UPDATE lost_items SET embedding=%s WHERE id=%s", (emb_json, item_id))
-                print(f"[LOST UPDATE] ✓ Unified embedding updated for item {item_id}")
-            
+            updated = cur.rowcount > 0
             conn.commit()
         except Exception as e:
             print(f"[LOST UPDATE] ERROR: {str(e)}")
@@ -532,6 +497,13 @@ def update_lost_item(item_id):
             cur.close()
             conn.close()
 
+        # Re-embedding + matching run in the background worker
+        if updated:
+            try:
+                enqueue_item_embedding('lost', item_id)
+            except Exception as e:
+                print(f"[LOST UPDATE] Could not queue embedding job: {str(e)}")
+
         flash('Lost item updated successfully!', 'success')
         return redirect(url_for('user.my_lost_items'))
 
@@ -542,10 +514,19 @@ def delete_found_item(id):
     conn = get_db(); cur = conn.cursor()
     try:
         cur.execute("DELETE FROM found_items WHERE id=%s AND user_id=%s", (id, current_user.id))
+        deleted = cur.rowcount > 0
+        if deleted:
+            bump_after_commit([current_user.id], 'matches')
         conn.commit()
     finally:
         cur.close(); conn.close()
 
+    if deleted:
+        try:
+            enqueue_item_removal('found', id)
+        except Exception as e:
+            print(f"[FOUND DELETE] Could not queue removal job: {str(e)}")
+
     flash('Found item deleted successfully!', 'info')
     return redirect(url_for('user.my_found_items'))
 
@@ -762,6 +743,7 @@ def api_found_item(id):
     })
 
 @user_bp.route('/api/matches-count')
+@conditional_get('matches')
 @login_required
 def api_matches_count():
     """API endpoint to get count of matches with pending claims"""
@@ -779,7 +761,7 @@ def api_matches_count():
             AND (c.id IS NULL OR c.status = 'Pending')
         """, (current_user.id, current_user.id))
         result = cur.fetchone()
-        matches_count = result[0] if result else 0
+        matches_count = result['matches_count'] if result else 0
         return jsonify({'matches_count': matches_count})
     except Exception as e:
         print(f"Error fetching matches count: {e}")
@@ -789,6 +771,29 @@ def api_matches_count():
         conn.close()
 
 
+@user_bp.route('/api/item-processing/<item_type>/<int:item_id>')
+@login_required
+def api_item_processing(item_type, item_id):
+    """Status of the background embedding/matching job for one of the user's items"""
+    item_type = item_type.lower()
+    if item_type not in ('lost', 'found'):
+        return jsonify({'error': 'Invalid item type'}), 400
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        table = 'lost_items' if item_type == 'lost' else 'found_items'
+        cur.execute(f"SELECT id FROM {table} WHERE id=%s AND user_id=%s", (item_id, current_user.id))
+        if not cur.fetchone():
+            return jsonify({'error': 'Item not found'}), 404
+    finally:
+        cur.close()
+        conn.close()
+
+    job = get_latest_job(f"embed:{item_type}:{item_id}")
+    return jsonify({'item_id': item_id, 'item_type': item_type, 'job': job})
+
+
 @user_bp.route('/api/item-claim/<int:item_id>/<item_type>')
 @login_required
 def api_item_claim(item_id, item_type):
@@ -3,7 +3,9 @@ from flask import Blueprint, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 import pymysql.cursors
 from db import get_db
-from services.notifications import notify
+from services.notification_outbox import queue_notifications
+from services.notifications import get_admin_ids
+from services.user_versions import bump_after_commit
 
 user_items_bp = Blueprint('user_items', __name__)
 
@@ -131,20 +133,16 @@ def claim_item_from_modal():
         else:
             cur.execute("UPDATE lost_items SET status='Claimed' WHERE id=%s", (item_id,))
         conn.commit()
+        bump_after_commit([current_user.id, item_owner_id], 'matches')
         print(f"[CLAIM] ✓ Item status updated to 'Claimed'")
 
         # Notify admins
-        print(f"[CLAIM] Fetching admins for notification...")
-        cur.execute("SELECT id FROM users WHERE role='admin'")
-        admins = cur.fetchall()
-        print(f"[CLAIM] Found {len(admins)} admin(s)")
-        
+        admin_ids = get_admin_ids()
+        print(f"[CLAIM] Notifying {len(admin_ids)} admin(s)")
         title = 'New Claim Submitted 📝'
         message = f'User {current_user.name} submitted a claim on {item_type} item: "{item_name}".'
-        for admin in admins:
-            admin_id = admin.get('id') if isinstance(admin, dict) else admin[0]
-            print(f"[CLAIM] Notifying admin {admin_id}...")
-            notify(user_id=admin_id, notification_type='new_claim', title=title, message=message, related_id=claim_id)
+        queue_notifications(admin_ids, 'new_claim', title, message, related_id=claim_id)
+        conn.commit()
 
         print(f"[CLAIM] ✓ Claim submission complete! Claim ID: {claim_id}")
         flash('Your claim has been submitted and is pending review.', 'success')
@@ -3,7 +3,9 @@ from flask import render_template, request, redirect, session, url_for, flash
 from flask_login import login_required, current_user
 from db import get_db
 from user.routes import user_bp
-from services.notifications import notify
+from services.notification_outbox import queue_notifications
+from services.notifications import get_admin_ids
+from services.user_versions import claims_changed
 import pymysql.cursors   # for DictCursor
 
 @user_bp.route('/matches')
@@ -135,6 +137,7 @@ def submit_claim():
             VALUES (%s, %s, %s, %s, 'Pending', %s, NOW())
         """, (match_id, lost_item_id, found_item_id, current_user.id, justification))
         conn.commit()
+        claims_changed(lost_item_id, found_item_id, user_ids=[current_user.id])
 
         # Get the inserted claim ID
         cur.execute("SELECT LAST_INSERT_ID()")
@@ -143,20 +146,15 @@ def submit_claim():
 
         print(f"\n[CLAIM SUBMIT] User {current_user.id} submitted claim {claim_id}")
 
-        # Get admin users to notify
-        cur.execute("SELECT id FROM users WHERE role='admin'")
-        admins = cur.fetchall()
-
         # Send notification to all admins
-        for admin in admins:
-            admin_id = admin.get('id') if isinstance(admin, dict) else admin[0]
-            notify(
-                user_id=admin_id,
-                notification_type='new_claim',
-                title='New Claim Submitted 📝',
-                message=f'User {current_user.name} submitted a claim for "{lost_name}" and "{found_name}".',
-                related_id=claim_id
-            )
+        queue_notifications(
+            get_admin_ids(),
+            'new_claim',
+            'New Claim Submitted 📝',
+            f'User {current_user.name} submitted a claim for "{lost_name}" and "{found_name}".',
+            related_id=claim_id
+        )
+        conn.commit()
 
         flash("Your claim has been submitted and is pending review.", "success")
         return redirect(url_for('user.matches'))